@@ -1 +0,0 @@
-from .openapi import TokenScheme
@@ -5,3 +5,8 @@ class AuthConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.auth"
     label = "studx_auth"
+
+    def ready(self):
+        from .authentication import connect_signals
+
+        connect_signals()
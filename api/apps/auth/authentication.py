@@ -0,0 +1,113 @@
+import binascii
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+from knox.models import AuthToken
+from redis import RedisError
+from rest_framework import exceptions
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def token_cache_key(digest: str) -> str:
+    return f"auth:token:{digest}"
+
+
+def user_cache_key(user_id: int) -> str:
+    return f"auth:user:{user_id}"
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Knox token authentication, caching the validated tokens and their users.
+
+    A token seen in the last `AUTH_CACHE_TTL` seconds is authenticated without any
+    query. As knox only refreshes a token on a cache miss, the refresh writes happen
+    at most once per `AUTH_CACHE_TTL` too. While Redis is unavailable, every token is
+    looked up by knox.
+    """
+
+    def authenticate_credentials(self, token: bytes):
+        try:
+            digest = hash_token(token.decode("utf-8"))
+        except (TypeError, UnicodeDecodeError, binascii.Error):
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        try:
+            auth = self.get_cached(digest)
+        except RedisError:
+            logger.warning("Could not read the cached auth token")
+            auth = None
+
+        if auth is not None:
+            return auth
+
+        user, auth_token = super().authenticate_credentials(token)
+
+        try:
+            cache.set_many(
+                {
+                    token_cache_key(digest): {
+                        "token_key": auth_token.token_key,
+                        "user_id": user.pk,
+                        "expiry": auth_token.expiry,
+                    },
+                    user_cache_key(user.pk): user,
+                },
+                settings.AUTH_CACHE_TTL,
+            )
+        except RedisError:
+            logger.warning("Could not cache the auth token of User(%s)", user.pk)
+
+        return user, auth_token
+
+    def get_cached(self, digest: str):
+        if (cached := cache.get(token_cache_key(digest))) is None:
+            return None
+
+        if cached["expiry"] is not None and cached["expiry"] < timezone.now():
+            # Let knox clean the expired token up
+            return None
+
+        if (user := cache.get(user_cache_key(cached["user_id"]))) is None:
+            return None
+
+        auth_token = AuthToken(
+            digest=digest,
+            token_key=cached["token_key"],
+            user=user,
+            expiry=cached["expiry"],
+        )
+
+        return self.validate_user(auth_token)
+
+
+def invalidate_token(sender, instance: AuthToken, **kwargs):
+    try:
+        cache.delete(token_cache_key(instance.digest))
+    except RedisError:
+        logger.exception(
+            "Could not uncache the auth token of User(%s)", instance.user_id
+        )
+
+
+def invalidate_user(sender, instance: User, **kwargs):
+    try:
+        cache.delete(user_cache_key(instance.pk))
+    except RedisError:
+        logger.exception("Could not uncache User(%s)", instance.pk)
+
+
+def connect_signals():
+    post_delete.connect(invalidate_token, AuthToken)
+    post_save.connect(invalidate_user, User)
+    post_delete.connect(invalidate_user, User)
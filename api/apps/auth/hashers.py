@@ -0,0 +1,14 @@
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ProvisionalPasswordHasher(PBKDF2PasswordHasher):
+    """A cheap PBKDF2 hasher for the initial passwords of bulk-provisioned accounts.
+
+    These passwords are derived from the usernames, so hashing them with the default
+    iteration count only makes imports CPU-bound. As this hasher is not the preferred
+    one, Django re-hashes the password with the default hasher on the first successful
+    login.
+    """
+
+    algorithm = "provisional_pbkdf2_sha256"
+    iterations = 1
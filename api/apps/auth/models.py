@@ -1,10 +1,32 @@
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
+
+from helpers.images import schedule_renditions
 
 
 class User(AbstractUser):
     picture = models.ImageField(null=True, blank=True)
+    picture_renditions = models.JSONField(default=dict, blank=True)
     settings = models.JSONField(default=dict)
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Trigrams of the `UPPER(...)` Postgres uses for `icontains` lookups, for the
+            # search of the members of the organizations
+            GinIndex(
+                *(
+                    OpClass(Upper(field), name="gin_trgm_ops")
+                    for field in ("username", "first_name", "last_name", "email")
+                ),
+                name="studx_user_search_trgm_idx",
+            ),
+        ]
+
     def __str__(self) -> str:
         return self.username
+
+
+# Generate the renditions of the pictures of the following models
+models.signals.post_save.connect(schedule_renditions, User)
@@ -1,7 +1,20 @@
+"""
+Schema generation.
+
+The extensions of this module are registered along `AutoSchema`, the schema class of
+the views, so that processes which never build a view (workers, most commands) don't
+load the schema machinery.
+"""
+
 from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from drf_spectacular.openapi import AutoSchema as BaseAutoSchema
 from drf_spectacular.plumbing import build_bearer_security_scheme_object
 
 
+class AutoSchema(BaseAutoSchema):
+    pass
+
+
 class TokenScheme(OpenApiAuthenticationExtension):
     target_class = "knox.auth.TokenAuthentication"
     name = "TokenAuth"
@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from helpers.images import PictureRenditionsField
+
 from .models import User
 
 
@@ -17,6 +19,16 @@ class SignupRequestSerializer(serializers.Serializer):
 
 
 class UserSerializer(serializers.ModelSerializer):
+    picture_renditions = PictureRenditionsField()
+
     class Meta:
         model = User
-        fields = ("username", "email", "first_name", "last_name", "picture", "settings")
+        fields = (
+            "username",
+            "email",
+            "first_name",
+            "last_name",
+            "picture",
+            "picture_renditions",
+            "settings",
+        )
@@ -1,3 +1,120 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from knox.models import AuthToken
+from redis import RedisError
+from rest_framework.test import APITestCase
+
+from apps.auth.hashers import ProvisionalPasswordHasher
+from apps.auth.models import User
+from apps.studx.models import Organization
+from tasks.add_members import import_chunk
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("student", "student@studx.com")
+        cls.url = reverse("studx_auth:whoami")
+
+    def setUp(self):
+        cache.clear()
+        self.token = self.authenticate()
+
+    def authenticate(self, **kwargs) -> str:
+        _, token = AuthToken.objects.create(self.user, **kwargs)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {token}")
+
+        return token
+
+    def test_cached_tokens_are_not_queried(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_logout(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.assertEqual(
+            self.client.post(reverse("studx_auth:logout")).status_code, 204
+        )
+
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_logout_all(self):
+        other = self.token
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.authenticate()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.assertEqual(
+            self.client.post(reverse("studx_auth:logout_all")).status_code, 204
+        )
+
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {other}")
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_edited_users_are_not_served_from_the_cache(self):
+        self.assertEqual(self.client.get(self.url).data["first_name"], "")
+
+        self.user.first_name = "Ada"
+        self.user.save()
+
+        self.assertEqual(self.client.get(self.url).data["first_name"], "Ada")
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_expired_tokens_are_refused(self):
+        self.authenticate(expiry=timedelta(seconds=30))
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        # The cache entry lives for `AUTH_CACHE_TTL`, after the expiry of the token
+        later = timezone.now() + timedelta(seconds=45)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_requests_without_redis(self):
+        with mock.patch.object(cache, "get", side_effect=RedisError), mock.patch.object(
+            cache, "set_many", side_effect=RedisError
+        ), mock.patch("apps.auth.authentication.logger") as logger:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        self.assertEqual(logger.warning.call_count, 2)
+
+        with mock.patch.object(cache, "delete", side_effect=RedisError), mock.patch(
+            "apps.auth.authentication.logger"
+        ):
+            self.assertEqual(
+                self.client.post(reverse("studx_auth:logout")).status_code, 204
+            )
+
+
+class ProvisionalPasswordTests(APITestCase):
+    def algorithm(self) -> str:
+        return User.objects.get(username="ada").password.split("$")[0]
+
+    def test_provisional_hash_is_upgraded_on_first_login(self):
+        org = Organization.objects.create(name="School")
+        import_chunk(org, {"ada": "student"})
+        url = reverse("studx_auth:signin")
+
+        self.assertEqual(self.algorithm(), ProvisionalPasswordHasher.algorithm)
+
+        response = self.client.post(url, {"username": "ada", "password": "wrong"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.algorithm(), ProvisionalPasswordHasher.algorithm)
+
+        response = self.client.post(url, {"username": "ada", "password": "ada"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.algorithm(), "pbkdf2_sha256")
+        self.assertTrue(User.objects.get(username="ada").check_password("ada"))
@@ -1,6 +1,5 @@
 from operator import itemgetter
 
-import jwt
 from django.conf import settings
 from django.contrib.auth import get_user_model, login
 from django.http import Http404, QueryDict
@@ -31,6 +30,8 @@ class SignupView(APIView):
             serializer.validated_data
         )
 
+        import jwt
+
         _ = User.objects.create_user(username, email, password, is_active=False)
         query_params = QueryDict("", mutable=True)
         query_params["token"] = jwt.encode(
@@ -64,15 +65,15 @@ class SigninView(KnoxLoginView):
     def post(self, request):
         serializer = AuthTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        print("here")
         user = serializer.validated_data["user"]
         login(request, user)
-        print("there")
         return super(SigninView, self).post(request, format=format)
 
 
 class VerifyEmailView(APIView):
     def get(self, request: Request):
+        import jwt
+
         token = request.GET["token"]
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=settings.JWT_ALGORITHMS
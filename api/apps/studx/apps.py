@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class StudxConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.studx"
+
+    def ready(self):
+        from .cache import connect_signals
+
+        connect_signals()
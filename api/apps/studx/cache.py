@@ -0,0 +1,183 @@
+"""
+Cache of the organizations and memberships reads.
+
+Entries are keyed by the versions of the scopes (organizations, users) they depend
+on. Invalidating a scope drops its version, so every entry built from it becomes
+unreachable at once and expires on its own. The versions are only dropped once the
+changes are committed, so that no concurrent read caches the previous state again.
+
+The reads fall back to the database while Redis is unavailable.
+"""
+
+import hashlib
+import logging
+import time
+from collections.abc import Callable, Iterable
+from contextlib import suppress
+from typing import Any
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete
+from redis import RedisError
+
+from apps.auth.serializers import UserSerializer
+from apps.studx.models import OrganizationMembership
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+CACHE_TTL = 5 * 60
+
+# The versions outlive the entries built from them by far. One expiring early only
+# orphans its entries, which are then computed again.
+VERSION_TTL = 24 * 60 * 60
+
+# How long a miss is computed by a single process while the others wait for it
+LOCK_TTL = 10
+LOCK_POLL_INTERVAL = 0.05
+
+
+def org_scope(slug: str) -> str:
+    return f"org:{slug}"
+
+
+def user_scope(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def version_key(scope: str) -> str:
+    return f"version:{scope}"
+
+
+def cache_key(name: str, *scopes: str, params: str = "") -> str | None:
+    """
+    Build the key of an entry depending on the current versions of `scopes`.
+
+    :return: None if the versions can't be read, the entry is then not cached.
+    """
+
+    keys = [version_key(scope) for scope in scopes]
+
+    try:
+        versions = cache.get_many(keys)
+
+        for key in keys:
+            if key not in versions:
+                # Concurrent requests must agree on the new version
+                cache.add(key, time.time_ns(), VERSION_TTL)
+                versions[key] = cache.get(key)
+    except RedisError:
+        logger.warning("Could not read the versions of %s", ", ".join(scopes))
+        return None
+
+    digest = hashlib.md5(params.encode()).hexdigest()
+
+    return ":".join([name, *(f"{versions[key]}" for key in keys), digest])
+
+
+def get_or_set(key: str | None, compute: Callable[[], Any], timeout: int = CACHE_TTL):
+    """
+    Get an entry, computing it on a miss.
+
+    Only one process computes a given entry at a time, the others wait for its
+    result instead of all hitting the database. `None` results are not cached, and
+    entries without a key, or while the cache is unavailable, are only computed.
+    """
+
+    if key is None:
+        return compute()
+
+    lock = f"lock:{key}"
+
+    try:
+        if (value := cache.get(key)) is not None:
+            return value
+
+        if not cache.add(lock, 1, LOCK_TTL):
+            deadline = time.monotonic() + LOCK_TTL
+            while time.monotonic() < deadline:
+                time.sleep(LOCK_POLL_INTERVAL)
+                entries = cache.get_many([key, lock])
+                if (value := entries.get(key)) is not None:
+                    return value
+                if lock not in entries:
+                    # Computed as `None`, or failed
+                    break
+    except RedisError:
+        logger.warning("Could not read the cache entry %s", key)
+        return compute()
+
+    try:
+        if (value := compute()) is not None:
+            try:
+                cache.set(key, value, timeout)
+            except RedisError:
+                logger.warning("Could not store the cache entry %s", key)
+    finally:
+        with suppress(RedisError):
+            cache.delete(lock)
+
+    return value
+
+
+def invalidate(*scopes: str):
+    """Drop the versions of `scopes`, once the current transaction is committed."""
+
+    keys = [version_key(scope) for scope in scopes]
+
+    def delete():
+        try:
+            cache.delete_many(keys)
+        except RedisError:
+            logger.exception("Could not invalidate %d cache scopes", len(keys))
+
+    transaction.on_commit(delete)
+
+
+def invalidate_users(user_ids: Iterable[int]):
+    invalidate(*map(user_scope, user_ids))
+
+
+def invalidate_org(slug: str, members: bool = False):
+    """
+    Invalidate the entries of an organization.
+
+    :param members: Whether to invalidate the entries of its members too, for the
+        changes visible in their list of organizations.
+    """
+
+    invalidate(org_scope(slug))
+
+    if members:
+        invalidate_users(
+            OrganizationMembership.objects.filter(org__slug=slug).values_list(
+                "user_id", flat=True
+            )
+        )
+
+
+def invalidate_member(sender, instance: User, update_fields=None, **kwargs):
+    """Invalidate the organizations listing a user among their members."""
+
+    # Saves of fields that are not serialized, e.g. `last_login`
+    if update_fields is not None and not update_fields & {*UserSerializer.Meta.fields}:
+        return
+
+    invalidate(
+        *map(
+            org_scope,
+            OrganizationMembership.objects.filter(user=instance).values_list(
+                "org__slug", flat=True
+            ),
+        )
+    )
+
+
+def connect_signals():
+    # The profiles and pictures of the members are part of the cached rosters
+    post_save.connect(invalidate_member, User)
+    # Before their memberships are deleted along with them
+    pre_delete.connect(invalidate_member, User)
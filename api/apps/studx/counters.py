@@ -0,0 +1,82 @@
+"""
+Per-user counters of unread notifications, kept in Redis.
+
+A counter is only updated when it exists. A missing one is computed from the database
+on read, and expires after `UNREAD_TTL` seconds so that it can not drift forever. The
+recount is only stored if no other reader stored one in the meantime, which the updates
+since may already have been added to.
+"""
+
+import logging
+from collections.abc import Mapping
+
+from django.contrib.auth import get_user_model
+from redis import RedisError
+
+from core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+UNREAD_TTL = 24 * 60 * 60
+
+# Add ARGV[i] to KEYS[i] if it exists, without going below zero
+INCR_IF_EXISTS = """
+for i, key in ipairs(KEYS) do
+    if redis.call("EXISTS", key) == 1 then
+        if redis.call("INCRBY", key, ARGV[i]) < 0 then
+            redis.call("SET", key, 0, "KEEPTTL")
+        end
+    end
+end
+"""
+
+
+def unread_key(user_id: int) -> str:
+    return f"studx:notifications:unread:{user_id}"
+
+
+def get_unread_count(user: User) -> int:
+    try:
+        if (count := get_redis().get(unread_key(user.pk))) is not None:
+            return int(count)
+    except RedisError:
+        logger.warning("Could not read the unread count of User(%s)", user.pk)
+        return user.notifications.unread().count()
+
+    count = user.notifications.unread().count()
+    set_unread_count(user.pk, count, recount=True)
+
+    return count
+
+
+def set_unread_count(user_id: int, count: int, recount: bool = False):
+    """
+    Set the counter of a user.
+
+    :param recount: The count was computed from the database, it is not stored over an
+        existing counter.
+    """
+
+    try:
+        get_redis().set(unread_key(user_id), count, ex=UNREAD_TTL, nx=recount)
+    except RedisError:
+        logger.warning("Could not set the unread count of User(%s)", user_id)
+
+
+def incr_unread_counts(deltas: Mapping[int, int]):
+    """Add each delta to the counter of the corresponding user."""
+
+    if not deltas:
+        return
+
+    try:
+        get_redis().eval(
+            INCR_IF_EXISTS,
+            len(deltas),
+            *map(unread_key, deltas.keys()),
+            *deltas.values(),
+        )
+    except RedisError:
+        logger.warning("Could not update the unread counts of %d users", len(deltas))
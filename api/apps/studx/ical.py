@@ -0,0 +1,148 @@
+"""
+iCalendar (RFC 5545) feeds of the events, for calendar clients to subscribe to.
+
+The feeds are authenticated by a token in their URLs, which calendar clients can't
+send headers with. The tokens of a user are all revoked by resetting their key.
+"""
+
+import secrets
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+
+from apps.auth.models import User
+from apps.studx.models import Event, Organization
+
+# Longest content line, in octets, before it is folded
+LINE_LENGTH = 75
+
+
+def get_feed_key(user: User, reset: bool = False) -> str:
+    """Get the key signed in the feed tokens of a user, creating it if needed."""
+
+    if reset or "calendar_key" not in user.settings:
+        user.settings["calendar_key"] = secrets.token_urlsafe(16)
+        user.save(update_fields=["settings"])
+
+    return user.settings["calendar_key"]
+
+
+def get_feed_token(user: User, org: Organization | None = None) -> str:
+    """
+    Build the token of the feed of the events of a user.
+
+    :param org: Only include the events of this organization.
+    """
+
+    import jwt
+
+    return jwt.encode(
+        {
+            "calendar": user.pk,
+            "org": None if org is None else org.pk,
+            "key": get_feed_key(user),
+        },
+        settings.SECRET_KEY,
+        algorithm=settings.JWT_ALGORITHMS[0],
+    )
+
+
+def decode_feed_token(token: str) -> dict | None:
+    """Decode a feed token, `None` if it is not a valid one."""
+
+    import jwt
+
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=settings.JWT_ALGORITHMS
+        )
+    except jwt.InvalidTokenError:
+        return None
+
+    return payload if {"calendar", "org", "key"} <= payload.keys() else None
+
+
+def fold(line: str) -> str:
+    """Fold a content line, without splitting its UTF-8 characters."""
+
+    lines, current, size = [], "", 0
+
+    for char in line:
+        length = len(char.encode())
+        if size + length > LINE_LENGTH:
+            lines.append(current)
+            current, size = " ", 1
+        current += char
+        size += length
+
+    lines.append(current)
+
+    return "\r\n".join(lines) + "\r\n"
+
+
+def escape(text: str) -> str:
+    return (
+        text.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def format_datetime(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def render_event(event: Event, host: str) -> str:
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:event-{event.pk}@{host}",
+        f"DTSTAMP:{format_datetime(event.updated_at)}",
+        f"CREATED:{format_datetime(event.created_at)}",
+        f"LAST-MODIFIED:{format_datetime(event.updated_at)}",
+        f"DTSTART:{format_datetime(event.starts_at)}",
+        f"DTEND:{format_datetime(event.ends_at)}",
+        f"SUMMARY:{escape(event.title)}",
+        f"DESCRIPTION:{escape(event.description)}",
+    ]
+
+    # The series are expanded by the clients
+    if event.recurrence:
+        lines.append(f"RRULE:{event.recurrence}")
+        if event.recurrence_exdates:
+            exdates = ",".join(
+                format_datetime(parse_datetime(exdate))
+                for exdate in event.recurrence_exdates
+            )
+            lines.append(f"EXDATE:{exdates}")
+
+    lines.append("END:VEVENT")
+
+    return "".join(fold(line) for line in lines)
+
+
+def stream_feed(events: Iterable[Event], name: str, host: str) -> Iterator[str]:
+    """
+    Render a feed, one event at a time.
+
+    :param host: The domain of the unique ids of the events.
+    """
+
+    yield "".join(
+        fold(line)
+        for line in (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//StudX//Events//EN",
+            "CALSCALE:GREGORIAN",
+            f"X-WR-CALNAME:{escape(name)}",
+        )
+    )
+
+    for event in events:
+        yield render_event(event, host)
+
+    yield fold("END:VCALENDAR")
@@ -0,0 +1,313 @@
+import json
+import statistics
+import time
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import jwt
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import resolve, reverse
+from django.utils import timezone
+from knox.models import AuthToken
+from PIL import Image
+
+from apps.auth.models import User
+from apps.studx.ical import get_feed_token
+from apps.studx.models import Event, Organization, OrganizationGroup
+from core.celery import app
+
+BENCHMARKS_DIR = settings.BASE_DIR / "benchmarks"
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the studx and auth endpoints against the data of `manage.py seed`, "
+        "comparing them with a baseline"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--requests", type=int, default=50)
+        parser.add_argument("--prefix", default="seed")
+        parser.add_argument("--password", default="studx")
+        parser.add_argument(
+            "--baseline",
+            type=Path,
+            help="Defaults to one file per cache mode, in the benchmarks directory",
+        )
+        parser.add_argument(
+            "--save", action="store_true", help="Save the results as the baseline"
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed slowdown of the p95 latencies, as a ratio",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Disable the cache, to measure the database",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2:
+            raise CommandError("At least 2 requests per endpoint are needed")
+
+        if options["baseline"] is None:
+            name = "baseline-no-cache" if options["no_cache"] else "baseline"
+            options["baseline"] = BENCHMARKS_DIR / f"{name}.json"
+
+        # Allows the host of the test client and keeps the emails in memory
+        setup_test_environment()
+        overrides = {}
+        if options["no_cache"]:
+            overrides["CACHES"] = {
+                "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+            }
+
+        # The tasks are sent to an in-memory broker, where nothing runs them. The app
+        # read the Django settings when it was loaded, so it is configured directly,
+        # under their namespace.
+        celery = {
+            "CELERY_BROKER_URL": "memory://",
+            "CELERY_RESULT_BACKEND": "cache+memory://",
+        }
+        previous = {key: app.conf[key] for key in celery}
+        app.conf.update(celery)
+
+        try:
+            with TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root, **overrides
+            ):
+                results = self.run(options)
+        finally:
+            app.conf.update(previous)
+            teardown_test_environment()
+
+        self.report(results, options)
+
+    def run(self, options) -> dict[str, dict]:
+        prefix = options["prefix"]
+
+        try:
+            org = Organization.objects.select_related("created_by").get(
+                slug=f"{prefix}-org-0"
+            )
+        except Organization.DoesNotExist:
+            raise CommandError(f"No data seeded with {prefix!r}, run `manage.py seed`")
+
+        results = {}
+
+        # Nothing done by the benchmark outlives it
+        try:
+            with transaction.atomic():
+                for label, method, url, data in self.endpoints(org, options):
+                    results[label] = self.measure(method, url, data, options)
+                raise Rollback()
+        except Rollback:
+            pass
+
+        return results
+
+    def endpoints(self, org: Organization, options):
+        """Requests to every endpoint, made as the admin of the largest org."""
+
+        admin = org.created_by
+        member = User.objects.filter(organizations=org).exclude(pk=admin.pk).first()
+        event = Event.objects.filter(org=org, meeting_id__isnull=False).first()
+        notification = admin.notifications.first()
+        if member is None or event is None or notification is None:
+            raise CommandError("The seeded data is too small to be benchmarked")
+
+        inactive = User.objects.create_user(
+            f"{options['prefix']}_inactive", "inactive@studx.test", is_active=False
+        )
+        _, token = AuthToken.objects.create(admin)
+        self.client = Client(HTTP_AUTHORIZATION=f"Token {token}")
+
+        slug = {"slug": org.slug}
+        event_kwargs = {"org_slug": org.slug, "pk": event.pk}
+        membership = {**slug, "username": member.username}
+        now = timezone.now()
+
+        def picture():
+            file = BytesIO()
+            Image.new("RGB", (256, 256)).save(file, "PNG")
+            file.name = "picture.png"
+            file.seek(0)
+            return {"image": file}
+
+        def members_file():
+            file = BytesIO(f"username,role\n{member.username},teacher\n".encode())
+            file.name = "members.csv"
+            return {"file": file}
+
+        signup = {
+            "username": f"{options['prefix']}_signup",
+            "email": "signup@studx.test",
+            "password": "A strong passw0rd",
+        }
+        signin = {"username": member.username, "password": options["password"]}
+        verification = {
+            "token": jwt.encode(
+                {"email": inactive.email},
+                settings.SECRET_KEY,
+                algorithm=settings.JWT_ALGORITHMS[0],
+            )
+        }
+        new_event = {
+            "title": "Benchmark",
+            "description": "Benchmark",
+            "attendees": member.username,
+            "starts_at": now,
+            "ends_at": now,
+        }
+        group = OrganizationGroup.objects.create(org=org, name="Benchmark")
+        group.members.set([admin, member])
+        groups = {"org_slug": org.slug}
+        group_kwargs = {**groups, "pk": group.pk}
+        new_group = {"name": "Group", "members": [admin.username, member.username]}
+        job = {**slug, "job_id": "00000000-0000-4000-8000-000000000000"}
+        by_meeting_id = {"org_slug": org.slug, "meeting_id": event.meeting_id}
+        read = {"pk": notification.pk}
+        feed = {"token": get_feed_token(admin)}
+
+        # Method, URL name, URL kwargs and data, or a function building it
+        requests = [
+            ("post", "studx_auth:signup", {}, signup),
+            ("post", "studx_auth:signin", {}, signin),
+            ("get", "studx_auth:verify_email", {}, verification),
+            ("get", "studx_auth:whoami", {}, None),
+            ("post", "studx_auth:logout", {}, None),
+            ("post", "studx_auth:logout_all", {}, None),
+            ("get", "studx:orgs-list", {}, None),
+            ("post", "studx:orgs-list", {}, {"name": "Benchmark"}),
+            ("get", "studx:orgs-detail", slug, None),
+            ("put", "studx:orgs-detail", slug, {"name": "Renamed", "about": ""}),
+            ("delete", "studx:orgs-detail", slug, None),
+            ("post", "studx:orgs-picture", slug, picture),
+            ("post", "studx:orgs-archive", slug, None),
+            ("get", "studx:orgs-members", slug, None),
+            ("post", "studx:orgs-members", slug, {**signin, "role": "teacher"}),
+            ("post", "studx:orgs-add-members-in-bulk", slug, members_file),
+            ("get", "studx:orgs-add-members-in-bulk-status", job, None),
+            ("get", "studx:orgs-membership", membership, None),
+            ("delete", "studx:orgs-membership", membership, None),
+            ("get", "studx:events-list", {"org_slug": org.slug}, None),
+            ("post", "studx:events-list", {"org_slug": org.slug}, new_event),
+            ("get", "studx:events-event-by-meeting-id", by_meeting_id, None),
+            ("put", "studx:events-detail", event_kwargs, None),
+            ("delete", "studx:events-detail", event_kwargs, None),
+            ("get", "studx:groups-list", groups, None),
+            ("post", "studx:groups-list", groups, new_group),
+            ("get", "studx:groups-detail", group_kwargs, None),
+            ("put", "studx:groups-detail", group_kwargs, new_group),
+            ("delete", "studx:groups-detail", group_kwargs, None),
+            ("get", "studx:notifications-list", {}, None),
+            ("get", "studx:notifications-unread", {}, None),
+            ("get", "studx:notifications-unread-count", {}, None),
+            ("get", "studx:notifications-read", {}, None),
+            ("post", "studx:notifications-mark-as-read", read, None),
+            ("post", "studx:notifications-mark-all-as-read", {}, None),
+            ("delete", "studx:notifications-detail", read, None),
+            ("delete", "studx:notifications-delete-all", {}, None),
+            ("get", "studx:calendar-list", {}, None),
+            ("get", "studx:calendar-feed", feed, None),
+            ("post", "studx:calendar-reset", {}, None),
+        ]
+
+        for method, name, url_kwargs, data in requests:
+            url = reverse(name, kwargs=url_kwargs)
+            yield f"{method.upper()} {resolve(url).view_name}", method, url, data
+
+    def measure(self, method: str, url: str, data, options) -> dict:
+        latencies, queries = [], []
+        send = getattr(self.client, method)
+        # The client only encodes the data of GET and POST requests
+        content_type = (
+            {"content_type": "application/json"} if method in ("put", "delete") else {}
+        )
+
+        # The first request warms the caches up
+        for _ in range(options["requests"] + 1):
+            request_kwargs = {
+                "data": data() if callable(data) else data,
+                **(content_type if data else {}),
+            }
+
+            try:
+                with transaction.atomic(), CaptureQueriesContext(
+                    connection
+                ) as captured:
+                    start = time.perf_counter()
+                    response = send(url, **request_kwargs)
+                    # The streamed responses are rendered while being read
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    queries.append(len(captured))
+                    raise Rollback()
+            except Rollback:
+                pass
+
+            if response.status_code >= 500:
+                raise CommandError(f"{method.upper()} {url}: {response.status_code}")
+
+        latencies, queries = latencies[1:], queries[1:]
+        quantiles = statistics.quantiles(latencies, n=100)
+
+        return {
+            "p50": quantiles[49],
+            "p95": quantiles[94],
+            "queries": max(queries),
+            "throughput": len(latencies) / (sum(latencies) / 1000),
+        }
+
+    def report(self, results: dict[str, dict], options):
+        baseline = (
+            json.loads(options["baseline"].read_text())
+            if options["baseline"].exists()
+            else {}
+        )
+        regressions = []
+
+        self.stdout.write(
+            f"{'endpoint':<48} {'p50':>9} {'p95':>9} {'queries':>7} {'req/s':>8}"
+        )
+        for label, result in results.items():
+            line = (
+                f"{label:<48} {result['p50']:>7.1f}ms {result['p95']:>7.1f}ms "
+                f"{result['queries']:>7} {result['throughput']:>8.1f}"
+            )
+
+            if (reference := baseline.get(label)) is not None:
+                slower = result["p95"] > reference["p95"] * (1 + options["tolerance"])
+                more_queries = result["queries"] > reference["queries"]
+                if slower or more_queries:
+                    regressions.append(label)
+                    line += (
+                        f"  REGRESSION (p95 {reference['p95']:.1f}ms, "
+                        f"{reference['queries']} queries)"
+                    )
+
+            self.stdout.write(line)
+
+        if options["save"]:
+            options["baseline"].parent.mkdir(parents=True, exist_ok=True)
+            options["baseline"].write_text(json.dumps(results, indent=2) + "\n")
+            self.stdout.write(f"Baseline saved to {options['baseline']}")
+        elif regressions:
+            raise CommandError(f"{len(regressions)} endpoints regressed")
@@ -0,0 +1,34 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = "Compare the latency of queries on fresh and persistent DB connections"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        for mode in ("fresh", "persistent"):
+            timings = []
+
+            for _ in range(options["iterations"]):
+                if mode == "fresh":
+                    connection.close()
+
+                start = time.perf_counter()
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+                timings.append((time.perf_counter() - start) * 1000)
+
+            quantiles = statistics.quantiles(timings, n=100)
+            self.stdout.write(
+                f"{mode:>10}: mean={statistics.fmean(timings):.2f}ms "
+                f"p50={quantiles[49]:.2f}ms p95={quantiles[94]:.2f}ms"
+            )
+
+        connection.close()
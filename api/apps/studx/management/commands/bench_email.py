@@ -0,0 +1,108 @@
+import json
+import socket
+import time
+from unittest import mock
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from core.redis import get_redis
+from tasks.email import (
+    PROCESSING_KEY,
+    QUEUE_KEY,
+    RETRY_KEY,
+    flush_emails_task,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare sending emails one connection each, as before the batches, and "
+        "flushing them from the Redis queue with `flush_emails_task`"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--messages", type=int, default=200)
+
+    def handle(self, *args, **options):
+        try:
+            from aiosmtpd.controller import Controller
+        except ImportError:
+            raise CommandError("aiosmtpd is required: poetry install --with dev")
+
+        redis = get_redis()
+        if any(redis.llen(key) for key in (QUEUE_KEY, PROCESSING_KEY, RETRY_KEY)):
+            raise CommandError("The queue holds emails to deliver, flush it first")
+
+        class Handler:
+            received = 0
+
+            async def handle_DATA(self, server, session, envelope):
+                self.received += 1
+                return "250 OK"
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        handler = Handler()
+        controller = Controller(handler, hostname="127.0.0.1", port=port)
+        controller.start()
+
+        smtp = override_settings(
+            EMAIL_BACKEND="django.core.mail.backends.smtp.EmailBackend",
+            EMAIL_HOST=controller.hostname,
+            EMAIL_PORT=port,
+            EMAIL_HOST_USER="",
+            EMAIL_HOST_PASSWORD="",
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+        )
+        emails = [
+            {
+                "subject": "Benchmark",
+                "body": "Hello",
+                "to": f"user-{i}@localhost",
+                "from_email": "studx@localhost",
+                "mime": "html",
+                "attempts": 0,
+            }
+            for i in range(options["messages"])
+        ]
+
+        try:
+            with smtp:
+                start = time.perf_counter()
+                for email_msg in emails:
+                    get_connection().send_messages(
+                        [
+                            EmailMessage(
+                                subject=email_msg["subject"],
+                                body=email_msg["body"],
+                                to=(email_msg["to"],),
+                                from_email=email_msg["from_email"],
+                            )
+                        ]
+                    )
+                per_message = time.perf_counter() - start
+
+                redis.rpush(QUEUE_KEY, *map(json.dumps, emails))
+                # Nothing is scheduled on the broker, the flush runs right here
+                with mock.patch.object(flush_emails_task, "apply_async"):
+                    start = time.perf_counter()
+                    flush_emails_task()
+                    flushed = time.perf_counter() - start
+        finally:
+            controller.stop()
+
+        if handler.received != 2 * len(emails):
+            raise CommandError(
+                f"{handler.received} of {2 * len(emails)} emails were delivered"
+            )
+
+        self.stdout.write(
+            f"one connection per message: {per_message * 1000:.0f}ms\n"
+            f"         flush_emails_task: {flushed * 1000:.0f}ms "
+            f"({per_message / flushed:.1f}x faster)"
+        )
@@ -0,0 +1,65 @@
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORT_TIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+# Only loaded by the code paths using them
+LAZY_MODULES = ("jwt", "PIL.WebPImagePlugin", "drf_spectacular.views")
+
+
+class Command(BaseCommand):
+    help = "Measure the import time of `manage.py check`, failing over a budget"
+
+    def add_arguments(self, parser):
+        parser.add_argument("-n", "--runs", type=int, default=5)
+        parser.add_argument("--budget", type=int, default=1000, help="In milliseconds")
+        parser.add_argument("--top", type=int, default=10)
+
+    def handle(self, *args, **options):
+        runs = [self.measure() for _ in range(options["runs"])]
+        # The least disturbed run
+        timings = min(runs, key=lambda timings: sum(timings.values()))
+        total = sum(timings.values()) / 1000
+
+        self.stdout.write(f"total: {total:.0f}ms (budget {options['budget']}ms)")
+        for name, cumulative in sorted(
+            timings.items(), key=lambda item: item[1], reverse=True
+        )[: options["top"]]:
+            self.stdout.write(f"{cumulative / 1000:>8.1f}ms {name}")
+
+        if loaded := [name for name in LAZY_MODULES if name in self.modules]:
+            raise CommandError(f"Loaded at startup: {', '.join(loaded)}")
+
+        if total > options["budget"]:
+            raise CommandError(
+                f"Startup over budget by {total - options['budget']:.0f}ms"
+            )
+
+    def measure(self) -> dict[str, int]:
+        """Import time of each top-level import, in microseconds."""
+
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "manage.py", "check"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if process.returncode:
+            raise CommandError(process.stderr)
+
+        timings = defaultdict(int)
+        self.modules = set()
+
+        for line in process.stderr.splitlines():
+            if match := IMPORT_TIME.match(line):
+                _, cumulative, indent, name = match.groups()
+                self.modules.add(name)
+                if not indent:
+                    timings[name] += int(cumulative)
+
+        return timings
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import resource
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.studx.push import hub, stream
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the memory held by idle notification streams, and how long a "
+        "notification sent to all of them takes to be written"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("-c", "--connections", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        if options["connections"] < 1:
+            raise CommandError("At least 1 connection is needed")
+
+        asyncio.run(self.run(options["connections"]))
+
+    async def run(self, connections: int):
+        # The messages are dispatched by hand, no subscription to Redis is needed
+        hub.listener = asyncio.get_running_loop().create_future()
+
+        disconnected = asyncio.Event()
+        delivered = asyncio.Event()
+        received = 0
+
+        async def receive():
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict):
+            nonlocal received
+            if message.get("body", b"").startswith(b"event: notification"):
+                received += 1
+                if received == connections:
+                    delivered.set()
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+
+        streams = [
+            asyncio.create_task(stream(user_id, receive, send))
+            for user_id in range(connections)
+        ]
+        # Until every stream waits for its notifications
+        while len(hub.queues) < connections:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+
+        idle = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        message = {
+            "verb": "benchmark",
+            "timestamp": "2023-01-01T00:00:00+00:00",
+            "recipients": {f"{user_id}": user_id for user_id in range(connections)},
+        }
+
+        start = time.perf_counter()
+        hub.receive(json.dumps(message))
+        await delivered.wait()
+        elapsed = time.perf_counter() - start
+
+        disconnected.set()
+        await asyncio.gather(*streams)
+        hub.listener.cancel()
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        self.stdout.write(
+            f"     idle streams: {connections}\n"
+            f"memory per stream: {idle / connections / 1024:.1f}KiB "
+            f"({idle / 1024**2:.0f}MiB in total)\n"
+            f"  delivery to all: {elapsed * 1000:.0f}ms\n"
+            f"         peak RSS: {peak:.0f}MiB"
+        )
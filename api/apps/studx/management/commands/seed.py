@@ -0,0 +1,277 @@
+import random
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from datetime import timedelta
+from itertools import islice
+from uuid import UUID
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from notifications.models import Notification
+
+from apps.auth.models import User
+from apps.studx.models import Event, Organization, OrganizationMembership
+
+VERBS = ("added", "removed", "changed the status of", "created the event")
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic organizations, members, events and notifications"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orgs", type=int, default=10)
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--events", type=int, default=100_000)
+        parser.add_argument(
+            "--attendees", type=int, default=20, help="Attendees per event"
+        )
+        parser.add_argument("--notifications", type=int, default=1_000_000)
+        parser.add_argument("--password", default="studx")
+        parser.add_argument(
+            "--prefix", default="seed", help="Prefix of the usernames and org names"
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument(
+            "--clear", action="store_true", help="Delete the data of a previous run"
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        prefix = options["prefix"]
+
+        if options["clear"]:
+            self.clear(prefix)
+        elif User.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(f"Already seeded with {prefix!r}, use --clear first")
+
+        if options["orgs"] < 1 or options["users"] < options["orgs"]:
+            raise CommandError("At least one org, and one user per org, are needed")
+
+        # Only the ids of the users and events are kept, their objects are dropped
+        # along with each batch
+        with transaction.atomic():
+            users = self.create_users(prefix, options["users"], options["password"])
+            orgs = self.create_orgs(prefix, options["orgs"], users)
+            members = self.create_memberships(orgs, users)
+            events = self.create_events(
+                orgs, members, options["events"], options["attendees"]
+            )
+            self.create_notifications(orgs, users, events, options["notifications"])
+
+    def clear(self, prefix: str):
+        # Cascades to the memberships, events and notifications
+        with transaction.atomic():
+            Organization.objects.filter(name__startswith=f"{prefix}-").delete()
+            User.objects.filter(username__startswith=f"{prefix}_").delete()
+
+        self.stdout.write(f"Cleared {prefix!r}")
+
+    def bulk_create(
+        self,
+        model,
+        objects: Iterable,
+        label: str,
+        created: Callable[[list], None] | None = None,
+    ) -> int:
+        """
+        Create objects by batches, only one of which is held in memory at a time.
+
+        :param created: Called with each batch, once created.
+        :return: The number of objects created.
+        """
+
+        count = 0
+
+        for batch in batched(objects, self.batch_size):
+            model.objects.bulk_create(batch)
+            if created is not None:
+                created(batch)
+            count += len(batch)
+            self.stdout.write(f"\r{label}: {count}", ending="")
+            self.stdout.flush()
+
+        self.stdout.write("")
+
+        return count
+
+    def create_users(self, prefix: str, count: int, password: str) -> array:
+        """:return: The ids of the users."""
+
+        # Hashing is deliberately slow, all the users share a single hash
+        password = make_password(password)
+        user_ids = array("q")
+
+        self.bulk_create(
+            User,
+            (
+                User(
+                    username=f"{prefix}_user_{i}",
+                    email=f"{prefix}_user_{i}@studx.test",
+                    password=password,
+                )
+                for i in range(count)
+            ),
+            "users",
+            lambda batch: user_ids.extend(user.pk for user in batch),
+        )
+
+        return user_ids
+
+    def create_orgs(self, prefix: str, count: int, users: array) -> list[Organization]:
+        orgs = [
+            Organization(
+                name=f"{prefix}-org-{i}",
+                slug=f"{prefix}-org-{i}",
+                about="Synthetic organization",
+                created_by_id=users[i],
+            )
+            for i in range(count)
+        ]
+        self.bulk_create(Organization, orgs, "orgs")
+
+        return orgs
+
+    def create_memberships(
+        self, orgs: list[Organization], users: array
+    ) -> dict[int, array]:
+        """
+        Every user joins the first organization, and one of the others.
+
+        The creator of each organization is its admin, one member in ten is a teacher.
+
+        :return: The ids of the members of each organization.
+        """
+
+        members = {org.pk: array("q") for org in orgs}
+
+        def memberships():
+            for i, user_id in enumerate(users):
+                for org in {orgs[0], orgs[i % len(orgs)]}:
+                    members[org.pk].append(user_id)
+                    yield OrganizationMembership(
+                        org=org,
+                        user_id=user_id,
+                        role=(
+                            OrganizationMembership.Role.ADMIN
+                            if org.created_by_id == user_id
+                            else (
+                                OrganizationMembership.Role.TEACHER
+                                if i % 10 == 0
+                                else OrganizationMembership.Role.STUDENT
+                            )
+                        ),
+                    )
+
+        self.bulk_create(OrganizationMembership, memberships(), "memberships")
+
+        return members
+
+    def create_events(
+        self,
+        orgs: list[Organization],
+        members: dict[int, array],
+        count: int,
+        attendees: int,
+    ) -> tuple[array, array]:
+        """
+        Create the events of the organizations, a third of them for all the members, a
+        third for the students and a third for some attendees.
+
+        :return: The ids of the events, and the ids of their organizations.
+        """
+
+        now = timezone.now()
+        audiences = (
+            (Event.Audience.ORG, None),
+            (Event.Audience.ROLE, OrganizationMembership.Role.STUDENT),
+            (Event.Audience.ATTENDEES, None),
+        )
+        event_ids, org_ids = array("q"), array("q")
+        Attendee = Event.attendees.through
+
+        def events():
+            for i in range(count):
+                org = orgs[i % len(orgs)]
+                audience, role = audiences[i % len(audiences)]
+                starts_at = now + timedelta(
+                    minutes=self.random.randint(-180 * 24 * 60, 180 * 24 * 60)
+                )
+                yield Event(
+                    title=f"Event {i}",
+                    description="Synthetic event",
+                    meeting_id=f"{UUID(int=self.random.getrandbits(128), version=4)}",
+                    starts_at=starts_at,
+                    ends_at=starts_at + timedelta(hours=1),
+                    audience=audience,
+                    audience_role=role,
+                    org=org,
+                    created_by_id=org.created_by_id,
+                )
+
+        def created(batch: list[Event]):
+            event_ids.extend(event.pk for event in batch)
+            org_ids.extend(event.org_id for event in batch)
+            Attendee.objects.bulk_create(
+                [
+                    Attendee(event_id=event.pk, user_id=user_id)
+                    for event in batch
+                    if event.audience == Event.Audience.ATTENDEES
+                    for user_id in self.random.sample(
+                        members[event.org_id],
+                        min(attendees, len(members[event.org_id])),
+                    )
+                ],
+                batch_size=self.batch_size,
+            )
+
+        self.bulk_create(Event, events(), "events", created)
+
+        return event_ids, org_ids
+
+    def create_notifications(
+        self,
+        orgs: list[Organization],
+        users: array,
+        events: tuple[array, array],
+        count: int,
+    ):
+        user_type, org_type, event_type = (
+            ContentType.objects.get_for_model(model)
+            for model in (User, Organization, Event)
+        )
+        orgs_by_pk = {org.pk: org for org in orgs}
+        event_ids, org_ids = events
+        now = timezone.now()
+
+        def notifications():
+            for i in range(count):
+                if event_ids:
+                    index = self.random.randrange(len(event_ids))
+                    event_id, org = event_ids[index], orgs_by_pk[org_ids[index]]
+                else:
+                    event_id, org = None, self.random.choice(orgs)
+                yield Notification(
+                    recipient_id=self.random.choice(users),
+                    actor_content_type=user_type,
+                    actor_object_id=f"{org.created_by_id}",
+                    verb=self.random.choice(VERBS),
+                    action_object_content_type=event_id and event_type,
+                    action_object_object_id=event_id and f"{event_id}",
+                    target_content_type=org_type,
+                    target_object_id=f"{org.pk}",
+                    unread=self.random.random() < 0.3,
+                    timestamp=now - timedelta(minutes=i),
+                )
+
+        self.bulk_create(Notification, notifications(), "notifications")
@@ -0,0 +1,38 @@
+# Generated by Django 4.1.13 on 2026-10-18 15:38
+
+import django.db.models.functions.text
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("studx", "0005_event_org"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                fields=["org", "starts_at"], name="studx_event_org_starts_at_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="event",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Upper("meeting_id"),
+                name="studx_event_meeting_id_uniq",
+            ),
+        ),
+        # The attendees table is created by Django, so its indexes can't be declared
+        # on a model. This one lets the events of a user be read from the index only.
+        migrations.RunSQL(
+            sql=(
+                "CREATE INDEX studx_event_attendees_user_event_idx "
+                "ON studx_event_attendees (user_id, event_id);"
+            ),
+            reverse_sql="DROP INDEX studx_event_attendees_user_event_idx;",
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.13 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studx", "0006_event_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="organization",
+            name="picture_renditions",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.13 on 2026-10-18 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studx", "0007_organization_picture_renditions"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="organizationmembership",
+            index=models.Index(
+                fields=["org", "role"], name="studx_membership_org_role_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 4.1.13 on 2026-10-18 16:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def open_unattended_events(apps, schema_editor):
+    # The events without attendees used to be visible to everyone
+    Event = apps.get_model("studx", "Event")
+    Event.objects.filter(attendees=None).update(audience="org")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("studx", "0008_membership_role_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="audience",
+            field=models.CharField(
+                choices=[
+                    ("attendees", "ATTENDEES"),
+                    ("org", "ORG"),
+                    ("role", "ROLE"),
+                    ("group", "GROUP"),
+                ],
+                default="attendees",
+                max_length=50,
+            ),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="audience_role",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("admin", "ADMIN"),
+                    ("teacher", "TEACHER"),
+                    ("student", "STUDENT"),
+                ],
+                max_length=50,
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="OrganizationGroup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=50)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "members",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="org_groups",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "org",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="groups",
+                        to="studx.organization",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("org", "name")},
+            },
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="audience_group",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="events",
+                to="studx.organizationgroup",
+            ),
+        ),
+        migrations.RunPython(open_unattended_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.1.13 on 2026-10-18 16:09
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("studx", "0009_event_audience"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="recurrence",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="recurrence_exdates",
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="recurrence_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                condition=models.Q(("recurrence__isnull", False)),
+                fields=["org", "recurrence_until"],
+                name="studx_event_org_series_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("meeting_id"),
+                    name="text_pattern_ops",
+                ),
+                condition=models.Q(("recurrence__isnull", False)),
+                name="studx_event_series_meeting_idx",
+            ),
+        ),
+    ]
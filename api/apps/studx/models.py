@@ -1,7 +1,12 @@
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Upper
 
 from apps.auth.models import User
+from apps.studx.recurrence import get_until
 from helpers import generate_slug
+from helpers.images import schedule_renditions
 
 
 class Organization(models.Model):
@@ -11,6 +16,7 @@ class Organization(models.Model):
     slug = models.SlugField(max_length=255, null=True, blank=True, unique=True)
     about = models.TextField(blank=True, null=True)
     picture = models.ImageField(max_length=255, null=True, blank=True)
+    picture_renditions = models.JSONField(default=dict, blank=True)
     members = models.ManyToManyField(
         User, through="OrganizationMembership", related_name="organizations"
     )
@@ -40,15 +46,93 @@ class OrganizationMembership(models.Model):
 
     class Meta:
         unique_together = ("org", "user")
+        indexes = [
+            models.Index(fields=("org", "role"), name="studx_membership_org_role_idx"),
+        ]
+
+
+class OrganizationGroup(models.Model):
+    """A named set of members of an organization, such as a class."""
+
+    org = models.ForeignKey(
+        Organization, related_name="groups", on_delete=models.CASCADE
+    )
+    name = models.CharField(max_length=50)
+    members = models.ManyToManyField(User, related_name="org_groups", blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("org", "name")
+
+
+class EventQuerySet(models.QuerySet):
+    def visible_to(self, user: User):
+        """
+        Filter the events created by `user`, or whose audience includes them.
+
+        The symbolic audiences are resolved against the memberships of `user` when the
+        events are read, with one `EXISTS` each: the events are never duplicated.
+        """
+
+        memberships = OrganizationMembership.objects.filter(
+            org=OuterRef("org"), user=user
+        )
+        attendees = Event.attendees.through.objects.filter(
+            event=OuterRef("pk"), user=user
+        )
+        groups = OrganizationGroup.members.through.objects.filter(
+            organizationgroup=OuterRef("audience_group"), user=user
+        )
+
+        return self.filter(
+            Q(created_by=user)
+            | Q(Exists(attendees), audience=Event.Audience.ATTENDEES)
+            | Q(Exists(memberships), audience=Event.Audience.ORG)
+            | Q(
+                Exists(memberships.filter(role=OuterRef("audience_role"))),
+                audience=Event.Audience.ROLE,
+            )
+            | Q(Exists(groups), audience=Event.Audience.GROUP)
+        )
 
 
 class Event(models.Model):
+    class Audience(models.TextChoices):
+        # The users of `attendees`, for small ad-hoc lists
+        ATTENDEES = "attendees", "ATTENDEES"
+        # Resolved from the memberships when the events are read
+        ORG = "org", "ORG"
+        ROLE = "role", "ROLE"
+        GROUP = "group", "GROUP"
+
     title = models.CharField(max_length=100)
     description = models.CharField(max_length=255)
     meeting_id = models.CharField(max_length=100, null=True, blank=True)
     attendees = models.ManyToManyField(User, related_name="events")
+    audience = models.CharField(
+        max_length=50, choices=Audience.choices, default=Audience.ATTENDEES
+    )
+    audience_role = models.CharField(
+        max_length=50,
+        choices=OrganizationMembership.Role.choices,
+        null=True,
+        blank=True,
+    )
+    # The events of a deleted group are only visible to their creators
+    audience_group = models.ForeignKey(
+        OrganizationGroup,
+        related_name="events",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+    )
     starts_at = models.DateTimeField()
     ends_at = models.DateTimeField()
+    # An RFC 5545 RRULE, repeating the event from `starts_at`
+    recurrence = models.CharField(max_length=255, null=True, blank=True)
+    recurrence_exdates = models.JSONField(default=list, blank=True)
+    # The start of the last occurrence, null for the series without end
+    recurrence_until = models.DateTimeField(null=True, blank=True)
     org = models.ForeignKey(
         Organization,
         related_name="events",
@@ -66,11 +150,57 @@ class Event(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = EventQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=("org", "starts_at"), name="studx_event_org_starts_at_idx"
+            ),
+            # The series overlapping a window are read for each listing
+            models.Index(
+                fields=("org", "recurrence_until"),
+                condition=Q(recurrence__isnull=False),
+                name="studx_event_org_series_idx",
+            ),
+            # The occurrences are traced back to their series by meeting id prefix
+            models.Index(
+                OpClass(Upper("meeting_id"), name="text_pattern_ops"),
+                condition=Q(recurrence__isnull=False),
+                name="studx_event_series_meeting_idx",
+            ),
+        ]
+        constraints = [
+            # Matches the `UPPER(...)` Postgres uses for `meeting_id__iexact` lookups
+            models.UniqueConstraint(
+                Upper("meeting_id"), name="studx_event_meeting_id_uniq"
+            ),
+        ]
+
 
 def add_slug(sender, instance, *args, **kwargs):
     if not instance.slug:
         instance.slug = generate_slug(instance, "name")
 
 
+def add_recurrence_until(sender, instance, *args, **kwargs):
+    instance.recurrence_until = get_until(instance) if instance.recurrence else None
+
+
+def remove_from_groups(sender, instance, *args, **kwargs):
+    OrganizationGroup.members.through.objects.filter(
+        organizationgroup__org_id=instance.org_id, user_id=instance.user_id
+    ).delete()
+
+
 # Generate slugs for the following models
 models.signals.pre_save.connect(add_slug, Organization)
+
+# Compute the end of the recurring events
+models.signals.pre_save.connect(add_recurrence_until, Event)
+
+# Members leaving an organization leave its groups too
+models.signals.post_delete.connect(remove_from_groups, OrganizationMembership)
+
+# Generate the renditions of the pictures of the following models
+models.signals.post_save.connect(schedule_renditions, Organization)
@@ -0,0 +1,80 @@
+from collections.abc import Iterable
+from datetime import datetime
+from itertools import islice
+
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class EventsPagination(CursorPagination):
+    """
+    Keyset pagination over the occurrences of the events, in chronological order.
+
+    The occurrences of the recurring events are not stored, so the pages are cut from
+    a chronological stream instead of a queryset. The cursor holds the start of the
+    last occurrence of the page, and how many occurrences starting then it holds.
+    Only the next pages are linked.
+    """
+
+    ordering = ("starts_at", "pk")
+
+    def get_position(self, request) -> tuple[datetime | None, int]:
+        """
+        Decode the cursor of the requested page.
+
+        :return: The earliest start of the occurrences of the page, and how many of the
+            first ones starting then are on the previous pages.
+        """
+
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        if self.cursor is None:
+            return None, 0
+
+        try:
+            position = parse_datetime(self.cursor.position or "")
+        except ValueError:
+            position = None
+
+        if position is None or self.cursor.reverse:
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, self.cursor.offset
+
+    def paginate_occurrences(self, occurrences: Iterable) -> list:
+        """
+        Cut the requested page from the occurrences starting from its position.
+
+        Only the occurrences of the page, and the one after it, are consumed.
+        """
+
+        position, offset = (
+            (None, 0)
+            if self.cursor is None
+            else (parse_datetime(self.cursor.position), self.cursor.offset)
+        )
+        page = list(islice(occurrences, offset, offset + self.page_size + 1))
+
+        self.has_next = len(page) > self.page_size
+        self.page = page[: self.page_size]
+
+        if self.has_next:
+            last = self.page[-1].starts_at
+            count = sum(1 for occurrence in self.page if occurrence.starts_at == last)
+            # The whole page starts with the previous one
+            if last == position:
+                count += offset
+            self.next_cursor = Cursor(
+                offset=count, reverse=False, position=last.isoformat()
+            )
+
+        return self.page
+
+    def get_next_link(self):
+        return self.encode_cursor(self.next_cursor) if self.has_next else None
+
+    def get_previous_link(self):
+        return None
@@ -0,0 +1,20 @@
+from rest_framework import permissions
+
+from apps.studx.models import OrganizationMembership
+
+
+class IsOrgAdminOrMemberReadOnly(permissions.BasePermission):
+    """
+    Allow the members of the organization of the `org_slug` of the URL to read, and
+    its admins to write.
+    """
+
+    def has_permission(self, request, view) -> bool:
+        memberships = OrganizationMembership.objects.filter(
+            org__slug=view.kwargs["org_slug"], user=request.user
+        )
+
+        if request.method not in permissions.SAFE_METHODS:
+            memberships = memberships.filter(role=OrganizationMembership.Role.ADMIN)
+
+        return memberships.exists()
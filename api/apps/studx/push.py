@@ -0,0 +1,204 @@
+"""
+Server-Sent Events stream of the notifications of a user.
+
+Notifications are published on a single Redis channel. Each ASGI process holds one
+subscription to it and dispatches the messages to the streams opened by their
+recipients, so that an idle stream costs no Redis connection nor database query.
+"""
+
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from collections.abc import Mapping
+from urllib.parse import parse_qs
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from knox.auth import TokenAuthentication
+from redis import RedisError
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "studx:notifications"
+
+STREAM_PATH = "/api/notifications/stream"
+
+# Sent as SSE comments, so that dead connections are noticed and proxies keep them open
+KEEPALIVE_INTERVAL = 30
+
+
+def publish(verb: str, timestamp: str, notifications: Mapping[int, int]):
+    """
+    Publish notifications to their recipients' streams.
+
+    :param notifications: A mapping of recipient id to notification id.
+    """
+
+    if not notifications:
+        return
+
+    message = {
+        "verb": verb,
+        "timestamp": timestamp,
+        "recipients": {f"{user_id}": pk for user_id, pk in notifications.items()},
+    }
+
+    try:
+        get_redis().publish(CHANNEL, json.dumps(message))
+    except RedisError:
+        logger.warning("Could not publish %d notifications", len(notifications))
+
+
+class Hub:
+    """Dispatch the messages of `CHANNEL` to the queues of the connected users."""
+
+    def __init__(self):
+        self.queues: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self.listener: asyncio.Task | None = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+
+        queue = asyncio.Queue()
+        self.queues[user_id].add(queue)
+
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        self.queues[user_id].discard(queue)
+        if not self.queues[user_id]:
+            del self.queues[user_id]
+
+    async def listen(self):
+        while True:
+            try:
+                async with aioredis.Redis.from_url(settings.REDIS_URL) as client:
+                    async with client.pubsub() as pubsub:
+                        await pubsub.subscribe(CHANNEL)
+                        async for message in pubsub.listen():
+                            if message["type"] == "message":
+                                self.receive(message["data"])
+            except RedisError:
+                logger.exception("Lost the subscription to %s", CHANNEL)
+                await asyncio.sleep(1)
+
+    def receive(self, data: bytes | str):
+        """Dispatch a message, a malformed one is logged and dropped."""
+
+        try:
+            message = json.loads(data)
+            event = {"verb": message["verb"], "timestamp": message["timestamp"]}
+            recipients = {
+                int(user_id): pk for user_id, pk in message["recipients"].items()
+            }
+        except (ValueError, TypeError, KeyError, AttributeError):
+            logger.warning("Dropped a malformed message of %s: %.200r", CHANNEL, data)
+            return
+
+        self.dispatch(event, recipients)
+
+    def dispatch(self, event: dict, recipients: Mapping[int, int]):
+        for user_id, pk in recipients.items():
+            for queue in self.queues.get(user_id, ()):
+                queue.put_nowait({**event, "pk": pk})
+
+
+hub = Hub()
+
+
+@sync_to_async
+def authenticate(token: str):
+    close_old_connections()
+    try:
+        user, _ = TokenAuthentication().authenticate_credentials(token.encode())
+        return user
+    except AuthenticationFailed:
+        return None
+    finally:
+        close_old_connections()
+
+
+def get_token(scope: dict) -> str | None:
+    """Get the knox token from the `Authorization` header, or the `token` parameter.
+
+    Browsers can't set headers on an `EventSource`, hence the query parameter.
+    """
+
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            keyword, _, token = value.decode("latin1").partition(" ")
+            return token if keyword == "Token" else None
+
+    return next(iter(parse_qs(scope["query_string"].decode()).get("token", [])), None)
+
+
+async def wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def notifications_stream(scope, receive, send):
+    """ASGI application streaming the notifications of the authenticated user."""
+
+    token = get_token(scope)
+    user = None if token is None else await authenticate(token)
+
+    if user is None:
+        await send({"type": "http.response.start", "status": 401, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    await stream(user.pk, receive, send)
+
+
+async def stream(user_id: int, receive, send):
+    """Stream the notifications of a user, until the client disconnects."""
+
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        }
+    )
+
+    queue = hub.subscribe(user_id)
+    disconnect = asyncio.create_task(wait_for_disconnect(receive))
+
+    try:
+        while not disconnect.done():
+            get = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait(
+                {get, disconnect},
+                timeout=KEEPALIVE_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+
+            if get in done:
+                body = f"event: notification\ndata: {json.dumps(get.result())}\n\n"
+            else:
+                get.cancel()
+                body = ": keepalive\n\n"
+
+            if not disconnect.done():
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": body.encode(),
+                        "more_body": True,
+                    }
+                )
+    finally:
+        hub.unsubscribe(user_id, queue)
+        disconnect.cancel()
@@ -0,0 +1,183 @@
+"""
+Recurring events, stored once with an RFC 5545 recurrence rule.
+
+Their occurrences are never stored: they are expanded lazily, only within the windows
+they are read in. Each occurrence has its own meeting id, derived from the one of its
+series and its start, so that it can be traced back to them.
+"""
+
+from __future__ import annotations
+
+import copy
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from itertools import islice
+from typing import TYPE_CHECKING
+from uuid import UUID
+
+from dateutil.rrule import rruleset, rrulestr
+from django.utils.dateparse import parse_datetime
+
+if TYPE_CHECKING:
+    # The models compute the ends of the series with this module
+    from apps.studx.models import Event
+
+# Length of the part of the meeting ids shared by all the occurrences of a series
+MEETING_ID_PREFIX_LENGTH = 24
+
+# Frequencies of the series created by the users, every listing expands them
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+MAX_OCCURRENCES = 1000
+
+
+def get_rules(rule: str, starts_at: datetime, exdates=()) -> rruleset:
+    """
+    Build the set of the starts of the occurrences of a series.
+
+    As per RFC 5545, the start of the series is always its first occurrence. Like the
+    rules, it is truncated to the second.
+
+    :raises ValueError: If the rule or the exception dates are invalid.
+    """
+
+    if "\n" in rule:
+        raise ValueError("Only a single RRULE is supported")
+
+    starts_at = starts_at.replace(microsecond=0)
+    rules = rrulestr(rule, dtstart=starts_at, forceset=True)
+    rules.rdate(starts_at)
+
+    for exdate in exdates:
+        if isinstance(exdate, str):
+            exdate = parse_datetime(exdate)
+        if exdate is None or exdate.tzinfo is None:
+            raise ValueError("Exception dates must be timezone-aware")
+        rules.exdate(exdate)
+
+    return rules
+
+
+def clean_rule(rule: str, starts_at: datetime, exdates=()) -> str:
+    """
+    Check that a rule submitted by a user is bounded, and normalize it.
+
+    The series must repeat daily at most, end with a `COUNT` or an `UNTIL`, and have
+    at most `MAX_OCCURRENCES` occurrences. A leading `RRULE:` is stripped, as the feeds
+    add their own.
+
+    :raises ValueError: If the rule is invalid or unbounded.
+    """
+
+    rule = rule.strip()
+    if rule[:6].upper() == "RRULE:":
+        rule = rule[6:]
+
+    parts = {}
+    for part in filter(None, rule.upper().split(";")):
+        name, separator, value = part.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid rule part: {part}")
+        parts[name] = value
+
+    if parts.get("FREQ") not in FREQUENCIES:
+        raise ValueError(f"The frequency must be one of {', '.join(FREQUENCIES)}")
+    if "COUNT" not in parts and "UNTIL" not in parts:
+        raise ValueError("The rule must end, with a COUNT or an UNTIL")
+    if any("," in parts.get(name, "") for name in ("BYHOUR", "BYMINUTE", "BYSECOND")):
+        raise ValueError("A series can have at most one occurrence per day")
+
+    rules = get_rules(rule, starts_at, exdates)
+    if next(islice(rules, MAX_OCCURRENCES, None), None) is not None:
+        raise ValueError(f"A series can have at most {MAX_OCCURRENCES} occurrences")
+
+    return rule
+
+
+def get_until(event: Event) -> datetime | None:
+    """The start of the last occurrence of a series, `None` if it is endless."""
+
+    rule = event.recurrence.upper()
+    if "UNTIL=" not in rule and "COUNT=" not in rule:
+        return None
+
+    last = event.starts_at
+    for last in get_rules(event.recurrence, event.starts_at, event.recurrence_exdates):
+        pass
+
+    return last
+
+
+def get_meeting_id(meeting_id: str, starts_at: datetime) -> str:
+    """
+    Derive the meeting id of an occurrence.
+
+    The timestamp of the occurrence is XOR-ed into the node of the UUID of its series,
+    keeping the version 4 layout of the meeting ids.
+    """
+
+    series = UUID(meeting_id)
+    node = series.node ^ int(starts_at.timestamp())
+
+    return f"{UUID(fields=(*series.fields[:5], node))}"
+
+
+def get_occurrence(event: Event, starts_at: datetime) -> Event:
+    """A copy of a series, moved to one of its occurrences."""
+
+    occurrence = copy.copy(event)
+    occurrence.starts_at = starts_at
+    occurrence.ends_at = starts_at + (event.ends_at - event.starts_at)
+
+    if event.meeting_id:
+        occurrence.meeting_id = get_meeting_id(event.meeting_id, starts_at)
+
+    return occurrence
+
+
+def get_occurrences(
+    event: Event, after: datetime | None = None, before: datetime | None = None
+) -> Iterator[Event]:
+    """
+    Lazily expand the occurrences of a series, in chronological order.
+
+    :param after: Only the occurrences starting from then are expanded.
+    :param before: Only the occurrences ending until then are expanded.
+    """
+
+    rules = get_rules(event.recurrence, event.starts_at, event.recurrence_exdates)
+    duration = event.ends_at - event.starts_at
+
+    for starts_at in rules if after is None else rules.xafter(after, inc=True):
+        if before is not None and starts_at + duration > before:
+            return
+
+        yield get_occurrence(event, starts_at)
+
+
+def find_occurrence(series, meeting_id: str) -> Event | None:
+    """
+    Find the occurrence of one of `series` with a meeting id.
+
+    :param series: The candidate series, a queryset of events.
+    """
+
+    candidates = series.filter(
+        recurrence__isnull=False,
+        meeting_id__istartswith=meeting_id[:MEETING_ID_PREFIX_LENGTH],
+    )
+    node = UUID(meeting_id).node
+
+    for event in candidates:
+        try:
+            starts_at = datetime.fromtimestamp(
+                node ^ UUID(event.meeting_id).node, tz=timezone.utc
+            )
+        except (ValueError, OverflowError, OSError):
+            continue
+
+        rules = get_rules(event.recurrence, event.starts_at, event.recurrence_exdates)
+
+        if next(rules.xafter(starts_at, inc=True), None) == starts_at:
+            return get_occurrence(event, starts_at)
+
+    return None
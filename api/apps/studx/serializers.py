@@ -1,20 +1,40 @@
-from functools import reduce
+import re
+from collections import defaultdict
+from functools import cached_property
 from uuid import uuid4
 
 from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Manager, Model, Prefetch
 from notifications.models import Notification
-from notifications.signals import notify
 from rest_framework import serializers
 
 from apps.auth.serializers import UserSerializer
-from apps.studx.models import Event, Organization, OrganizationMembership
+from apps.studx.models import (
+    Event,
+    Organization,
+    OrganizationGroup,
+    OrganizationMembership,
+)
+from apps.studx.recurrence import clean_rule
 from helpers import generate_slug
+from helpers.images import PictureRenditionsField
+from tasks.notifications import notify_audience
 
 
 class OrganizationSerializer(serializers.ModelSerializer):
+    picture_renditions = PictureRenditionsField()
+
     class Meta:
         model = Organization
-        fields = ("name", "slug", "about", "picture", "created_at")
+        fields = (
+            "name",
+            "slug",
+            "about",
+            "picture",
+            "picture_renditions",
+            "created_at",
+        )
 
     def update(self, instance, validated_data):
         slug = instance.slug
@@ -25,7 +45,6 @@ class OrganizationSerializer(serializers.ModelSerializer):
 
         if validated_data["name"] != name:
             slug = generate_slug(instance, "name")
-            print(slug)
 
         instance.slug = slug
         instance.save()
@@ -76,20 +95,147 @@ class AddMemberSerializer(serializers.Serializer):
         fields = ("username", "role")
 
 
+class UsernamesField(serializers.ListField):
+    """The usernames of the users of a many-to-many relation."""
+
+    child = serializers.CharField(max_length=150)
+
+    def get_attribute(self, instance):
+        return [user.username for user in getattr(instance, self.source).all()]
+
+
+class OrganizationGroupSerializer(serializers.ModelSerializer):
+    """
+    A group of members of an organization, which its `members` must all belong to.
+
+    The organization of the group is expected in the `org` context.
+    """
+
+    members = UsernamesField(required=False)
+
+    class Meta:
+        model = OrganizationGroup
+        fields = ("pk", "name", "members", "created_at")
+
+    def validate_name(self, value):
+        groups = OrganizationGroup.objects.filter(org=self.context["org"], name=value)
+
+        if self.instance is not None:
+            groups = groups.exclude(pk=self.instance.pk)
+
+        if groups.exists():
+            raise serializers.ValidationError("Group already exists")
+
+        return value
+
+    def validate_members(self, value):
+        users = get_user_model().objects.filter(
+            username__in=value, org_membership__org=self.context["org"]
+        )
+        found = {user.username: user for user in users}
+
+        if missing := sorted({*value} - found.keys()):
+            raise serializers.ValidationError(
+                f"Not members of the organization: {', '.join(missing)}"
+            )
+
+        return list(found.values())
+
+    def create(self, validated_data):
+        members = validated_data.pop("members", [])
+        group = OrganizationGroup.objects.create(
+            org=self.context["org"], **validated_data
+        )
+        group.members.set(members)
+
+        return group
+
+    def update(self, instance, validated_data):
+        members = validated_data.pop("members", None)
+        instance = super().update(instance, validated_data)
+
+        if members is not None:
+            instance.members.set(members)
+
+        return instance
+
+
 class GenericNotificationRelatedField(serializers.RelatedField):
+    @cached_property
+    def model_serializers(self):
+        return {
+            get_user_model(): (UserSerializer(), "User"),
+            Organization: (OrganizationSerializer(), "Organization"),
+            Event: (EventSerializer(), "Event"),
+        }
+
+    def get_attribute(self, instance):
+        # Use the objects resolved for the whole page by `NotificationListSerializer`
+        if (resolved := getattr(self.root, "resolved_objects", None)) is None:
+            return super().get_attribute(instance)
+
+        return resolved.get(
+            (
+                getattr(instance, f"{self.source}_content_type_id"),
+                getattr(instance, f"{self.source}_object_id"),
+            )
+        )
+
     def to_representation(self, value):
         data = None
 
-        if isinstance(value, get_user_model()):
-            data = {**UserSerializer(value).data, "type": "User"}
-        elif isinstance(value, Organization):
-            data = {**OrganizationSerializer(value).data, "type": "Organization"}
-        elif isinstance(value, Event):
-            data = {**EventSerializer(value).data, "type": "Event"}
+        if (serializer := self.model_serializers.get(type(value))) is not None:
+            serializer, type_ = serializer
+            data = {**serializer.to_representation(value), "type": type_}
         # TODO: Implements remaining serializers that will be used in notifications
         return data
 
 
+class NotificationListSerializer(serializers.ListSerializer):
+    """
+    Serialize notifications, resolving their generic relations in bulk.
+
+    The objects are fetched with one query per content type found in the page,
+    instead of one query per relation and notification.
+    """
+
+    generic_fields = ("actor", "target", "action_object")
+
+    def to_representation(self, data):
+        notifications = list(data.all() if isinstance(data, Manager) else data)
+        self.resolved_objects = self.resolve(notifications)
+
+        return super().to_representation(notifications)
+
+    def resolve(self, notifications) -> dict[tuple[int, str], Model]:
+        object_ids = defaultdict(set)
+
+        for notification in notifications:
+            for field in self.generic_fields:
+                if content_type_id := getattr(notification, f"{field}_content_type_id"):
+                    object_ids[content_type_id].add(
+                        getattr(notification, f"{field}_object_id")
+                    )
+
+        resolved = {}
+
+        for content_type_id, ids in object_ids.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            if model is None:
+                continue
+
+            queryset = model._default_manager.all()
+            if model is Event:
+                queryset = queryset.prefetch_related(
+                    Prefetch("attendees", queryset=get_user_model().objects.only("pk"))
+                )
+
+            for pk, instance in queryset.in_bulk(ids).items():
+                resolved[(content_type_id, f"{pk}")] = instance
+
+        return resolved
+
+
 class NotificationSerializer(serializers.ModelSerializer):
     actor = GenericNotificationRelatedField(read_only=True)
     target = GenericNotificationRelatedField(read_only=True)
@@ -98,6 +244,7 @@ class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = ("pk", "actor", "action_object", "verb", "target", "timestamp")
+        list_serializer_class = NotificationListSerializer
 
 
 class EventSerializer(serializers.ModelSerializer):
@@ -109,15 +256,43 @@ class EventSerializer(serializers.ModelSerializer):
             "description",
             "meeting_id",
             "attendees",
+            "audience",
+            "audience_role",
+            "audience_group",
             "starts_at",
             "ends_at",
+            "recurrence",
+            "recurrence_exdates",
             "created_at",
         )
 
 
 class CreateEventSerializer(serializers.ModelSerializer):
+    """
+    Create an event for its audience.
+
+    The `attendees` are comma or newline separated usernames. Without them, the
+    audience defaults to the whole organization. The other audiences are resolved when
+    the events are read, so creating them costs the same whatever their size.
+
+    A `recurrence` rule (an RFC 5545 RRULE, such as `FREQ=WEEKLY;BYDAY=MO,WE;COUNT=10`)
+    repeats the event, except on its `recurrence_exdates`. It must be bounded, see
+    `clean_rule`.
+
+    The organization of the event is expected in the `org` context.
+    """
+
     attendees = serializers.CharField(required=False)
     add_meeting_link = serializers.BooleanField(default=False, required=False)
+    audience = serializers.ChoiceField(choices=Event.Audience.choices, required=False)
+    audience_role = serializers.ChoiceField(
+        choices=OrganizationMembership.Role.choices, required=False
+    )
+    audience_group = serializers.CharField(max_length=50, required=False)
+    recurrence = serializers.CharField(max_length=255, required=False)
+    recurrence_exdates = serializers.ListField(
+        child=serializers.DateTimeField(), required=False
+    )
 
     class Meta:
         model = Event
@@ -126,48 +301,75 @@ class CreateEventSerializer(serializers.ModelSerializer):
             "description",
             "add_meeting_link",
             "attendees",
+            "audience",
+            "audience_role",
+            "audience_group",
             "starts_at",
             "ends_at",
+            "recurrence",
+            "recurrence_exdates",
         )
 
+    def validate_audience_group(self, value):
+        try:
+            return OrganizationGroup.objects.get(org=self.context["org"], name=value)
+        except OrganizationGroup.DoesNotExist:
+            raise serializers.ValidationError("Unknown group")
+
+    def validate(self, attrs):
+        attrs.setdefault(
+            "audience",
+            Event.Audience.ATTENDEES if attrs.get("attendees") else Event.Audience.ORG,
+        )
+
+        for audience, field in (
+            (Event.Audience.ROLE, "audience_role"),
+            (Event.Audience.GROUP, "audience_group"),
+        ):
+            if attrs["audience"] == audience:
+                if attrs.get(field) is None:
+                    raise serializers.ValidationError({field: ["Required"]})
+            else:
+                attrs.pop(field, None)
+
+        if attrs["audience"] != Event.Audience.ATTENDEES:
+            attrs.pop("attendees", None)
+
+        if attrs.get("recurrence"):
+            exdates = attrs.get("recurrence_exdates", [])
+            try:
+                attrs["recurrence"] = clean_rule(
+                    attrs["recurrence"], attrs["starts_at"], exdates
+                )
+            except ValueError as error:
+                raise serializers.ValidationError({"recurrence": [f"{error}"]})
+            attrs["recurrence_exdates"] = [exdate.isoformat() for exdate in exdates]
+        else:
+            attrs.pop("recurrence", None)
+            attrs.pop("recurrence_exdates", None)
+
+        return attrs
+
     def create(self, validated_data):
         if validated_data["add_meeting_link"]:
             validated_data["meeting_id"] = f"{uuid4()}"
 
         validated_data.pop("add_meeting_link", None)
 
-        attendees = filter(
-            None,
-            reduce(
-                lambda acc, val: [*acc, *val],
-                [
-                    string.split(",")
-                    for string in validated_data.get("attendees", "").split("\n")
-                ],
-                [],
-            ),
+        usernames = filter(
+            None, re.split(r"[,\n]", validated_data.pop("attendees", ""))
         )
-        attendees = [
-            member.user
-            for member in OrganizationMembership.objects.prefetch_related(
-                "user"
-            ).filter(org=validated_data["org"], user__username__in=attendees)
-        ]
-
-        validated_data.pop("attendees", None)
 
         event = Event.objects.create(**validated_data)
-        event.attendees.set(attendees)
-        event.save()
 
-        # Notify users that they have been added to the event
-        for user in attendees:
-            notify.send(
-                validated_data["created_by"],
-                verb="added",
-                action_object=event,
-                target=validated_data["org"],
-                recipient=user,
+        if event.audience == Event.Audience.ATTENDEES:
+            event.attendees.set(
+                OrganizationMembership.objects.filter(
+                    org=event.org, user__username__in=usernames
+                ).values_list("user_id", flat=True)
             )
 
+        # Notify users that they have been added to the event
+        notify_audience(validated_data["created_by"], "added", event)
+
         return event
@@ -1,3 +1,1458 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from smtplib import SMTPRecipientsRefused, SMTPServerDisconnected
+from io import BytesIO
+from itertools import count
+from tempfile import TemporaryDirectory
+from unittest import mock
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+from celery.exceptions import Retry
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core import mail
+from django.core.files.storage import default_storage
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from notifications.models import Notification
+from PIL import Image
+from redis import RedisError
+from redis import TimeoutError as RedisTimeoutError
+from rest_framework.test import APITestCase
+
+from apps.auth.models import User
+from apps.studx.cache import (
+    VERSION_TTL,
+    cache_key,
+    get_or_set,
+    invalidate_org,
+    org_scope,
+    version_key,
+)
+from apps.studx.counters import (
+    UNREAD_TTL,
+    get_unread_count,
+    set_unread_count,
+    unread_key,
+)
+from apps.studx.models import (
+    Event,
+    Organization,
+    OrganizationGroup,
+    OrganizationMembership,
+)
+from apps.studx.pagination import EventsPagination
+from apps.studx.push import Hub
+from apps.studx.urls import events_router, router, urlpatterns
+from core.metrics import METRICS_KEY, get_metrics_redis, get_query_budget
+from core.redis import get_redis
+from helpers.images import RENDITIONS
+from tasks.add_members import CHUNK_SIZE, add_members, get_import_job, import_chunk
+from tasks.email import (
+    FLUSH_LOCK_KEY,
+    MAX_ATTEMPTS,
+    PROCESSING_KEY,
+    QUEUE_KEY,
+    RETRY_KEY,
+    email_task,
+    flush_emails_task,
+)
+from tasks.notifications import notify_task, to_ref
+from tasks.pictures import renditions_task
+
+
+class EventIndexesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("student", "student@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.user)
+        cls.event = Event.objects.create(
+            title="Maths",
+            description="Algebra",
+            meeting_id=f"{uuid4()}",
+            starts_at=timezone.now(),
+            ends_at=timezone.now() + timedelta(hours=1),
+            org=cls.org,
+            created_by=cls.user,
+        )
+        cls.event.attendees.add(cls.user)
+
+    def setUp(self):
+        # The tables are too small for the planner to pick an index on its own
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def test_meeting_id_lookup_uses_index(self):
+        plan = Event.objects.filter(
+            meeting_id__iexact=self.event.meeting_id.upper()
+        ).explain()
+
+        self.assertIn("studx_event_meeting_id_uniq", plan)
+
+    def test_listing_uses_org_starts_at_index(self):
+        plan = Event.objects.filter(org=self.org).order_by("starts_at").explain()
+
+        self.assertIn("studx_event_org_starts_at_idx", plan)
+
+    def test_attendee_lookup_uses_user_index(self):
+        plan = (
+            Event.attendees.through.objects.filter(user=self.user)
+            .values("event_id")
+            .explain()
+        )
+
+        self.assertRegex(plan, r"Index (Only )?Scan using studx_event_attendees_user")
+
+    def test_series_lookups_use_partial_indexes(self):
+        series = Event.objects.filter(org=self.org, recurrence__isnull=False)
+
+        plan = series.filter(recurrence_until__gte=timezone.now()).explain()
+        self.assertIn("studx_event_org_series_idx", plan)
+
+        plan = series.filter(meeting_id__istartswith=self.event.meeting_id[:24])
+        self.assertIn("studx_event_series_meeting_idx", plan.explain())
+
+
+class EventsListingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("teacher", "teacher@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.user)
+        students = User.objects.bulk_create(
+            User(username=f"student-{i}", email=f"student-{i}@studx.com")
+            for i in range(5)
+        )
+
+        for i in range(10):
+            event = Event.objects.create(
+                title=f"Class {i}",
+                description="Class",
+                starts_at=timezone.now() + timedelta(days=i),
+                ends_at=timezone.now() + timedelta(days=i, hours=1),
+                org=cls.org,
+                created_by=cls.user,
+            )
+            event.attendees.set([cls.user, *students])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_list_runs_a_constant_number_of_queries(self):
+        # One query for the single events, one for the series and one for the attendees
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse("studx:events-list", kwargs={"org_slug": self.org.slug})
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 10)
+        self.assertEqual(len(response.data["results"][0]["attendees"]), 6)
+
+
+class EventAudienceTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user("teacher", "teacher@studx.com")
+        cls.student = User.objects.create_user("student", "student@studx.com")
+        cls.grouped = User.objects.create_user("grouped", "grouped@studx.com")
+        cls.outsider = User.objects.create_user("outsider", "outsider@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.teacher)
+        OrganizationMembership.objects.bulk_create(
+            [
+                OrganizationMembership(
+                    org=cls.org,
+                    user=cls.teacher,
+                    role=OrganizationMembership.Role.TEACHER,
+                ),
+                OrganizationMembership(org=cls.org, user=cls.student),
+                OrganizationMembership(org=cls.org, user=cls.grouped),
+            ]
+        )
+        cls.group = OrganizationGroup.objects.create(org=cls.org, name="Physics")
+        cls.group.members.add(cls.grouped)
+
+        def create_event(title, **kwargs):
+            return Event.objects.create(
+                title=title,
+                description=title,
+                starts_at=timezone.now(),
+                ends_at=timezone.now() + timedelta(hours=1),
+                org=cls.org,
+                created_by=cls.teacher,
+                **kwargs,
+            )
+
+        create_event("Assembly", audience=Event.Audience.ORG)
+        create_event(
+            "Exam",
+            audience=Event.Audience.ROLE,
+            audience_role=OrganizationMembership.Role.STUDENT,
+        )
+        create_event("Lab", audience=Event.Audience.GROUP, audience_group=cls.group)
+        create_event("Tutoring").attendees.add(cls.student)
+        cls.url = reverse("studx:events-list", kwargs={"org_slug": cls.org.slug})
+
+    def titles(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url)
+
+        return sorted(event["title"] for event in response.data["results"])
+
+    def test_audiences_are_resolved_from_the_memberships(self):
+        self.assertEqual(
+            self.titles(self.teacher), ["Assembly", "Exam", "Lab", "Tutoring"]
+        )
+        self.assertEqual(self.titles(self.student), ["Assembly", "Exam", "Tutoring"])
+        self.assertEqual(self.titles(self.grouped), ["Assembly", "Exam", "Lab"])
+        self.assertEqual(self.titles(self.outsider), [])
+
+        OrganizationMembership.objects.filter(user=self.student).update(
+            role=OrganizationMembership.Role.TEACHER
+        )
+
+        self.assertEqual(self.titles(self.student), ["Assembly", "Tutoring"])
+
+    def test_create_symbolic_audience(self):
+        self.client.force_authenticate(self.teacher)
+        data = {
+            "title": "Lab",
+            "description": "Lab",
+            "starts_at": timezone.now(),
+            "ends_at": timezone.now() + timedelta(hours=1),
+        }
+
+        for extra, audience in (
+            ({}, Event.Audience.ORG),
+            ({"audience": "role", "audience_role": "student"}, Event.Audience.ROLE),
+            ({"audience": "group", "audience_group": "Physics"}, Event.Audience.GROUP),
+            ({"attendees": "student,\ngrouped"}, Event.Audience.ATTENDEES),
+        ):
+            with self.subTest(audience):
+                response = self.client.post(self.url, {**data, **extra})
+
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(response.data["audience"], audience)
+
+        self.assertEqual(Event.objects.get(pk=response.data["pk"]).attendees.count(), 2)
+        self.assertEqual(Event.attendees.through.objects.count(), 3)
+
+        for extra in (
+            {"audience": "role"},
+            {"audience": "group", "audience_group": "Chemistry"},
+        ):
+            with self.subTest(extra):
+                response = self.client.post(self.url, {**data, **extra})
+
+                self.assertEqual(response.status_code, 400)
+
+
+class RecurringEventsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("teacher", "teacher@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.user)
+        OrganizationMembership.objects.create(org=cls.org, user=cls.user)
+        cls.monday = datetime(2026, 1, 5, 9, tzinfo=dt_timezone.utc)
+        cls.url = reverse("studx:events-list", kwargs={"org_slug": cls.org.slug})
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def create(self, **data):
+        return self.client.post(
+            self.url,
+            {
+                "title": "Maths",
+                "description": "Algebra",
+                "add_meeting_link": True,
+                "starts_at": self.monday,
+                "ends_at": self.monday + timedelta(hours=1),
+                **data,
+            },
+            format="json",
+        )
+
+    def list(self, url=None, **params):
+        return self.client.get(url or self.url, params)
+
+    def test_occurrences_are_expanded_within_the_window(self):
+        response = self.create(
+            recurrence="FREQ=WEEKLY;BYDAY=MO,WE;COUNT=6",
+            recurrence_exdates=[self.monday + timedelta(days=7)],
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Event.objects.count(), 1)
+        self.assertEqual(
+            Event.objects.get().recurrence_until, self.monday + timedelta(days=16)
+        )
+
+        response = self.list(
+            starts_after=(self.monday + timedelta(days=1)).isoformat(),
+            ends_before=(self.monday + timedelta(days=10)).isoformat(),
+        )
+
+        self.assertEqual(
+            [event["starts_at"] for event in response.data["results"]],
+            ["2026-01-07T09:00:00Z", "2026-01-14T09:00:00Z"],
+        )
+
+    def test_occurrences_are_merged_and_paginated(self):
+        self.create(recurrence="FREQ=DAILY;COUNT=30")
+        self.create(recurrence="RRULE:FREQ=DAILY;COUNT=30", add_meeting_link=False)
+        self.create(starts_at=self.monday + timedelta(days=1, hours=1))
+
+        starts, url = [], None
+        with mock.patch.object(EventsPagination, "page_size", 3):
+            for _ in range(3):
+                response = self.list(url)
+                starts += [event["starts_at"] for event in response.data["results"]]
+                url = response.data["next"]
+
+        self.assertEqual(
+            starts,
+            [
+                *["2026-01-05T09:00:00Z"] * 2,
+                *["2026-01-06T09:00:00Z"] * 2,
+                "2026-01-06T10:00:00Z",
+                *["2026-01-07T09:00:00Z"] * 2,
+                *["2026-01-08T09:00:00Z"] * 2,
+            ],
+        )
+
+    def test_occurrences_have_their_own_meeting_ids(self):
+        response = self.create(recurrence="FREQ=WEEKLY;COUNT=3", recurrence_exdates=[])
+        series = Event.objects.get()
+
+        meeting_ids = [event["meeting_id"] for event in self.list().data["results"]]
+
+        self.assertEqual(len(set(meeting_ids)), 3)
+        self.assertNotIn(series.meeting_id, meeting_ids)
+        self.assertEqual(response.data["meeting_id"], meeting_ids[0])
+        self.assertEqual(
+            meeting_ids, [event["meeting_id"] for event in self.list().data["results"]]
+        )
+
+        for i, meeting_id in enumerate(meeting_ids):
+            response = self.client.get(
+                reverse(
+                    "studx:events-event-by-meeting-id",
+                    kwargs={"org_slug": self.org.slug, "meeting_id": meeting_id},
+                )
+            )
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                parse_datetime(response.data["starts_at"]),
+                self.monday + timedelta(weeks=i),
+            )
+
+        response = self.client.get(
+            reverse(
+                "studx:events-event-by-meeting-id",
+                kwargs={"org_slug": self.org.slug, "meeting_id": series.meeting_id},
+            )
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+        series.recurrence_exdates = [f"{self.monday + timedelta(weeks=1)}"]
+        series.save()
+        response = self.client.get(
+            reverse(
+                "studx:events-event-by-meeting-id",
+                kwargs={"org_slug": self.org.slug, "meeting_id": meeting_ids[1]},
+            )
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_recurrence(self):
+        for recurrence in (
+            "FREQ=SOMETIMES",
+            "FREQ=DAILY;UNTIL=20260301",
+            "FREQ=DAILY",
+            "FREQ=HOURLY;COUNT=10",
+            "FREQ=SECONDLY;UNTIL=20260301T000000Z",
+            "FREQ=DAILY;BYHOUR=9,10;COUNT=10",
+            "FREQ=DAILY;COUNT=1001",
+            "FREQ=DAILY;UNTIL=99991231T000000Z",
+            "RRULE:RRULE:FREQ=DAILY;COUNT=2",
+            "COUNT",
+        ):
+            with self.subTest(recurrence):
+                response = self.create(recurrence=recurrence)
+
+                self.assertEqual(response.status_code, 400)
+
+    def test_leading_rrule_is_stripped(self):
+        self.create(recurrence="rrule:FREQ=WEEKLY;COUNT=3")
+
+        self.assertEqual(Event.objects.get().recurrence, "FREQ=WEEKLY;COUNT=3")
+
+
+class CalendarFeedTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("teacher", "teacher@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.user)
+        cls.other_org = Organization.objects.create(name="Club", created_by=cls.user)
+        OrganizationMembership.objects.bulk_create(
+            OrganizationMembership(org=org, user=cls.user)
+            for org in (cls.org, cls.other_org)
+        )
+        starts_at = datetime(2026, 1, 5, 9, tzinfo=dt_timezone.utc)
+
+        cls.series = Event.objects.create(
+            title="Maths, algebra",
+            description="Chapter 1; exercises\n" + "x" * 100,
+            starts_at=starts_at,
+            ends_at=starts_at + timedelta(hours=1),
+            recurrence="FREQ=WEEKLY;COUNT=10",
+            recurrence_exdates=[f"{starts_at + timedelta(weeks=1)}"],
+            audience=Event.Audience.ORG,
+            org=cls.org,
+            created_by=cls.user,
+        )
+        Event.objects.create(
+            title="Chess",
+            description="Tournament",
+            starts_at=starts_at,
+            ends_at=starts_at + timedelta(hours=1),
+            audience=Event.Audience.ORG,
+            org=cls.other_org,
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.urls = self.client.get(reverse("studx:calendar-list")).data
+        self.client.force_authenticate(None)
+
+    def get_feed(self, url, **headers):
+        response = self.client.get(url, **headers)
+        if response.streaming:
+            response.text = b"".join(response.streaming_content).decode()
+
+        return response
+
+    def test_feeds(self):
+        response = self.get_feed(self.urls["url"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/calendar; charset=utf-8")
+        self.assertEqual(response.text.count("BEGIN:VEVENT"), 2)
+        self.assertIn("SUMMARY:Maths\\, algebra\r\n", response.text)
+        self.assertIn("DESCRIPTION:Chapter 1\\; exercises\\n", response.text)
+        self.assertIn("RRULE:FREQ=WEEKLY;COUNT=10\r\n", response.text)
+        self.assertIn("EXDATE:20260112T090000Z\r\n", response.text)
+        self.assertTrue(
+            all(len(line.encode()) <= 75 for line in response.text.split("\r\n"))
+        )
+
+        org_urls = {org["slug"]: org["url"] for org in self.urls["orgs"]}
+        response = self.get_feed(org_urls[self.other_org.slug])
+
+        self.assertIn("SUMMARY:Chess", response.text)
+        self.assertNotIn("Maths", response.text)
+
+    def test_unchanged_feeds_are_not_rendered(self):
+        etag = self.get_feed(self.urls["url"])["ETag"]
+
+        # The user and the state of the feed
+        with self.assertNumQueries(2):
+            response = self.get_feed(self.urls["url"], HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+        self.series.title = "Physics"
+        self.series.save()
+        response = self.get_feed(self.urls["url"], HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+        etag = response["ETag"]
+        Event.objects.filter(org=self.other_org).delete()
+        response = self.get_feed(self.urls["url"], HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_revoked_and_invalid_tokens(self):
+        self.client.force_authenticate(self.user)
+        self.client.post(reverse("studx:calendar-reset"))
+        self.client.force_authenticate(None)
+
+        for url in (
+            self.urls["url"],
+            reverse("studx:calendar-feed", kwargs={"token": "invalid"}),
+        ):
+            with self.subTest(url):
+                self.assertEqual(self.get_feed(url).status_code, 404)
+
+
+class MembershipIndexesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("student", "student@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.user)
+        OrganizationMembership.objects.create(org=cls.org, user=cls.user)
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def test_member_search_uses_trigram_index(self):
+        plan = User.objects.filter(
+            Q(username__icontains="stud") | Q(email__icontains="stud")
+        ).explain()
+
+        self.assertIn("studx_user_search_trgm_idx", plan)
+
+    def test_role_filter_uses_org_role_index(self):
+        plan = OrganizationMembership.objects.filter(
+            org=self.org, role=OrganizationMembership.Role.STUDENT
+        ).explain()
+
+        self.assertIn("studx_membership_org_role_idx", plan)
+
+
+class OrganizationSlugTests(TestCase):
+    def test_collisions_get_a_suffix(self):
+        Organization.objects.create(name="Schooling")
+        slugs = [
+            Organization.objects.create(name=name).slug
+            for name in ("School", "School!", "school")
+        ]
+
+        self.assertEqual(slugs, ["school", "school-2", "school-3"])
+
+    def test_empty_slug(self):
+        org = Organization.objects.create(name="!!!")
+
+        # Random, rather than a prefix of all the slugs
+        self.assertRegex(org.slug, r"^[a-z0-9]{8}$")
+        self.assertNotEqual(Organization.objects.create(name="...").slug, org.slug)
+
+
+class OrganizationMembersTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("teacher", "teacher@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.user)
+        students = User.objects.bulk_create(
+            User(
+                username=f"student-{i}",
+                email=f"student-{i}@studx.com",
+                first_name="Ada" if i == 3 else "Alan",
+            )
+            for i in range(10)
+        )
+        OrganizationMembership.objects.bulk_create(
+            [
+                OrganizationMembership(
+                    org=cls.org, user=cls.user, role=OrganizationMembership.Role.TEACHER
+                ),
+                *(OrganizationMembership(org=cls.org, user=user) for user in students),
+            ]
+        )
+        cls.url = reverse("studx:orgs-members", kwargs={"slug": cls.org.slug})
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def usernames(self, response):
+        return [member["user"]["username"] for member in response.data["results"]]
+
+    def test_list_runs_a_constant_number_of_queries(self):
+        # One query for the count and one for the page, joined to the users
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 11)
+        self.assertEqual(self.usernames(response), sorted(self.usernames(response)))
+
+    def test_search(self):
+        for query, usernames in (
+            ("ada", ["student-3"]),
+            ("STUDENT-1", ["student-1"]),
+            ("teacher@", ["teacher"]),
+        ):
+            with self.subTest(query):
+                response = self.client.get(self.url, {"q": query})
+
+                self.assertEqual(self.usernames(response), usernames)
+
+    def test_role_filter(self):
+        response = self.client.get(self.url, {"role": "teacher"})
+
+        self.assertEqual(self.usernames(response), ["teacher"])
+
+        response = self.client.get(self.url, {"role": "principal"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class OrganizationGroupsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@studx.com")
+        cls.student = User.objects.create_user("student", "student@studx.com")
+        cls.outsider = User.objects.create_user("outsider", "outsider@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.admin)
+        OrganizationMembership.objects.bulk_create(
+            [
+                OrganizationMembership(
+                    org=cls.org, user=cls.admin, role=OrganizationMembership.Role.ADMIN
+                ),
+                OrganizationMembership(org=cls.org, user=cls.student),
+            ]
+        )
+        cls.group = OrganizationGroup.objects.create(org=cls.org, name="Class A")
+        cls.group.members.set([cls.student])
+        cls.url = reverse("studx:groups-list", kwargs={"org_slug": cls.org.slug})
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def test_crud(self):
+        response = self.client.post(
+            self.url, {"name": "Class B", "members": ["admin", "student"]}
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertCountEqual(response.data["members"], ["admin", "student"])
+
+        url = reverse(
+            "studx:groups-detail",
+            kwargs={"org_slug": self.org.slug, "pk": response.data["pk"]},
+        )
+        response = self.client.patch(url, {"members": ["admin"]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["members"], ["admin"])
+        self.assertEqual(
+            [group["name"] for group in self.client.get(self.url).data],
+            ["Class A", "Class B"],
+        )
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_members_must_belong_to_the_org(self):
+        response = self.client.post(
+            self.url, {"name": "Class B", "members": ["student", "outsider"]}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("outsider", f"{response.data['members']}")
+        self.assertFalse(OrganizationGroup.objects.filter(name="Class B").exists())
+
+    def test_names_are_unique_in_the_org(self):
+        response = self.client.post(self.url, {"name": "Class A"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_admins_write(self):
+        self.client.force_authenticate(self.student)
+
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.assertEqual(self.client.post(self.url, {"name": "B"}).status_code, 403)
+
+        self.client.force_authenticate(self.outsider)
+
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_leaving_the_org_leaves_its_groups(self):
+        other = Organization.objects.create(name="College", created_by=self.admin)
+        OrganizationMembership.objects.create(org=other, user=self.student)
+        other_group = OrganizationGroup.objects.create(org=other, name="Class A")
+        other_group.members.set([self.student])
+
+        OrganizationMembership.objects.filter(org=self.org, user=self.student).delete()
+
+        self.assertFalse(self.group.members.exists())
+        self.assertTrue(other_group.members.filter(pk=self.student.pk).exists())
+
+
+class OrganizationCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("teacher", "teacher@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.user)
+        OrganizationMembership.objects.create(
+            org=cls.org, user=cls.user, role=OrganizationMembership.Role.ADMIN
+        )
+        cls.url = reverse("studx:orgs-members", kwargs={"slug": cls.org.slug})
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.user)
+
+    def first_name(self) -> str:
+        return self.client.get(self.url).data["results"][0]["user"]["first_name"]
+
+    def test_profile_change_invalidates_roster(self):
+        self.assertEqual(self.first_name(), "")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.first_name = "Ada"
+            self.user.save()
+
+        self.assertEqual(self.first_name(), "Ada")
+
+        # Not part of the roster
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save(update_fields=["last_login"])
+
+        self.assertEqual(callbacks, [])
+
+    def test_versions_expire(self):
+        with mock.patch.object(cache, "add", wraps=cache.add) as add:
+            cache_key("members", org_scope(self.org.slug))
+
+        add.assert_called_once_with(
+            version_key(org_scope(self.org.slug)), mock.ANY, VERSION_TTL
+        )
+
+    def test_invalidation_waits_for_commit(self):
+        self.assertEqual(self.first_name(), "")
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            User.objects.filter(pk=self.user.pk).update(first_name="Ada")
+            invalidate_org(self.org.slug)
+            # Until the commit, reads still get the previous state
+            self.assertEqual(self.first_name(), "")
+
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(self.first_name(), "Ada")
+
+    def test_reads_without_redis(self):
+        with mock.patch.object(cache, "get_many", side_effect=RedisError), mock.patch(
+            "apps.studx.cache.logger"
+        ):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 1)
+
+        key = cache_key("members", org_scope(self.org.slug))
+        with mock.patch.object(cache, "get", side_effect=RedisError), mock.patch(
+            "apps.studx.cache.logger"
+        ):
+            self.assertEqual(get_or_set(key, lambda: "computed"), "computed")
+
+
+class BulkImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.org = Organization.objects.create(name="School")
+        cls.teacher = User.objects.create_user("teacher", "teacher@studx.com")
+
+    def import_members(self, lines: list[str], **kwargs) -> dict:
+        with TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            filepath = default_storage.save(
+                "members.csv", ContentFile("\n".join(["username,role", *lines]))
+            )
+            with mock.patch.object(add_members, "update_state") as update_state:
+                progress = add_members(self.org.slug, filepath, **kwargs)
+
+        self.assertEqual(update_state.call_args.kwargs["meta"], progress)
+
+        return progress
+
+    def test_import_in_chunks(self):
+        # Not a multiple of the chunk size, the last chunk is partial and repeats a row
+        # of the first one
+        rows = CHUNK_SIZE * 2 + 7
+        lines = [f"student_{i}," for i in range(rows - 2)]
+
+        progress = self.import_members(["teacher,Teacher", *lines, "student_0,"])
+
+        self.assertEqual(
+            progress,
+            {
+                "org": self.org.slug,
+                "chunks": 3,
+                "processed": rows,
+                "updated": 1,
+                "created": rows - 1,
+            },
+        )
+        self.assertEqual(
+            dict(
+                OrganizationMembership.objects.filter(
+                    user__username__in=["teacher", "student_3"]
+                ).values_list("user__username", "role")
+            ),
+            {"teacher": "teacher", "student_3": "student"},
+        )
+
+        progress = self.import_members(["teacher,admin", "student_3,teacher"])
+
+        self.assertEqual(progress["updated"], 2)
+        self.assertEqual(progress["created"], 0)
+
+    def test_retry_resumes(self):
+        lines = [f"student_{i}," for i in range(CHUNK_SIZE + 1)]
+        chunks = []
+
+        # The last chunk fails the first time
+        def fail_once(org, roles):
+            chunks.append(len(roles))
+            if chunks == [CHUNK_SIZE, 1]:
+                raise DatabaseError()
+            return import_chunk(org, roles)
+
+        with mock.patch(
+            "tasks.add_members.import_chunk", side_effect=fail_once
+        ), mock.patch.object(add_members, "retry", side_effect=Retry) as retry:
+            with self.assertRaises(Retry):
+                self.import_members(lines)
+            # Only the chunks after the ones already imported are retried
+            progress = self.import_members(lines, **retry.call_args.kwargs["kwargs"])
+
+        self.assertEqual(
+            progress,
+            {
+                "org": self.org.slug,
+                "chunks": 2,
+                "processed": CHUNK_SIZE + 1,
+                "updated": 0,
+                "created": CHUNK_SIZE + 1,
+            },
+        )
+
+    def test_job_of_another_org(self):
+        failure = mock.Mock(
+            state="FAILURE", info=ValueError(), args=[self.org.slug, "members.csv"]
+        )
+
+        with mock.patch.object(add_members, "AsyncResult", return_value=failure):
+            self.assertEqual(get_import_job(self.org.slug, "job")["status"], "failed")
+            self.assertIsNone(get_import_job("other", "job"))
+
+        # Jobs stored without their arguments are not served
+        failure.args = None
+        with mock.patch.object(add_members, "AsyncResult", return_value=failure):
+            self.assertIsNone(get_import_job(self.org.slug, "job"))
+
+
+class NotifyTaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", "admin@studx.com")
+        cls.teacher = User.objects.create_user("teacher", "teacher@studx.com")
+        cls.students = [
+            User.objects.create_user(f"student-{i}", f"student-{i}@studx.com")
+            for i in range(3)
+        ]
+        cls.outsider = User.objects.create_user("outsider", "outsider@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.admin)
+        OrganizationMembership.objects.bulk_create(
+            [
+                OrganizationMembership(
+                    org=cls.org, user=cls.admin, role=OrganizationMembership.Role.ADMIN
+                ),
+                OrganizationMembership(
+                    org=cls.org,
+                    user=cls.teacher,
+                    role=OrganizationMembership.Role.TEACHER,
+                ),
+                *(
+                    OrganizationMembership(org=cls.org, user=user)
+                    for user in cls.students
+                ),
+            ]
+        )
+        cls.group = OrganizationGroup.objects.create(org=cls.org, name="Class A")
+        cls.group.members.set([cls.admin, cls.students[0]])
+
+    def notify(self, **audience) -> set[int]:
+        Notification.objects.all().delete()
+        notify_task(to_ref(self.admin), "added", target=to_ref(self.org), **audience)
+
+        return set(Notification.objects.values_list("recipient_id", flat=True))
+
+    def test_recipients_of_each_audience(self):
+        students = {user.pk for user in self.students}
+
+        for audience, recipients in (
+            ({"org_id": self.org.pk}, {self.teacher.pk, *students}),
+            ({"org_id": self.org.pk, "role": "student"}, students),
+            ({"org_id": self.org.pk, "role": "teacher"}, {self.teacher.pk}),
+            ({"group_id": self.group.pk}, {self.students[0].pk}),
+            (
+                {"recipient_ids": [self.admin.pk, self.outsider.pk]},
+                {self.outsider.pk},
+            ),
+            ({"recipient_ids": []}, set()),
+        ):
+            with self.subTest(audience):
+                self.assertEqual(self.notify(**audience), recipients)
+
+    def test_notifications_are_inserted_in_batches(self):
+        with mock.patch("tasks.notifications.BATCH_SIZE", 2), CaptureQueriesContext(
+            connection
+        ) as queries:
+            count = notify_task(
+                to_ref(self.admin), "added", org_id=self.org.pk, target=to_ref(self.org)
+            )
+
+        self.assertEqual(count, 4)
+        inserts = [
+            query
+            for query in queries
+            if query["sql"].startswith('INSERT INTO "notifications_notification"')
+        ]
+        self.assertEqual(len(inserts), 2)
+
+    def test_counters_are_updated_when_publishing_fails(self):
+        for user in self.students:
+            set_unread_count(user.pk, 1)
+
+        with mock.patch("apps.studx.push.get_redis") as get_redis, self.assertLogs(
+            "apps.studx.push", "WARNING"
+        ):
+            get_redis.return_value.publish.side_effect = RedisError
+            notify_task(to_ref(self.admin), "added", org_id=self.org.pk, role="student")
+
+        for user in self.students:
+            self.assertEqual(get_unread_count(user), 2)
+
+
+class UnreadCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("student", "student@studx.com")
+
+    def test_recount_does_not_overwrite_counter(self):
+        with mock.patch("apps.studx.counters.get_redis") as get_redis:
+            get_redis.return_value.get.return_value = None
+            self.assertEqual(get_unread_count(self.user), 0)
+
+        # A counter set, and maybe updated, by a concurrent reader is kept
+        get_redis.return_value.set.assert_called_once_with(
+            unread_key(self.user.pk), 0, ex=UNREAD_TTL, nx=True
+        )
+
+
+class PictureRenditionsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("teacher", "teacher@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.user)
+        OrganizationMembership.objects.create(
+            org=cls.org, user=cls.user, role=OrganizationMembership.Role.ADMIN
+        )
+        cls.url = reverse("studx:orgs-picture", kwargs={"slug": cls.org.slug})
+
+    def setUp(self):
+        media_root = TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings = self.settings(MEDIA_ROOT=media_root.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_authenticate(self.user)
+
+    def upload(self, content: bytes):
+        file = BytesIO(content)
+        file.name = "picture.png"
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(self.url, {"image": file}, format="multipart")
+
+        return response, callbacks
+
+    def picture(self, size=(512, 256)) -> bytes:
+        file = BytesIO()
+        Image.new("RGB", size).save(file, "PNG")
+
+        return file.getvalue()
+
+    def test_renditions(self):
+        with mock.patch.object(renditions_task, "delay") as delay:
+            response, callbacks = self.upload(self.picture())
+            for callback in callbacks:
+                callback()
+
+        self.assertEqual(response.status_code, 200)
+        delay.assert_called_once_with("studx.Organization", self.org.pk)
+
+        renditions_task(*delay.call_args.args)
+
+        org = Organization.objects.get(pk=self.org.pk)
+        self.assertEqual(org.picture_renditions["source"], org.picture.name)
+        for rendition, size in RENDITIONS.items():
+            with default_storage.open(org.picture_renditions[rendition]) as file:
+                with Image.open(file) as image:
+                    self.assertEqual(image.format, "WEBP")
+                    self.assertEqual(image.size, (size, size // 2))
+
+    def test_invalid_uploads_are_refused(self):
+        for content in (b"not an image", self.picture()[:32]):
+            with self.subTest(content[:8]):
+                response, callbacks = self.upload(content)
+
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(callbacks, [])
+
+        with mock.patch.object(Image, "MAX_IMAGE_PIXELS", 64):
+            response, _ = self.upload(self.picture(size=(16, 16)))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Organization.objects.get(pk=self.org.pk).picture)
+
+    def test_invalid_pictures_are_not_retried(self):
+        # Stored before the uploads were checked
+        self.org.picture.save("pictures/broken.png", ContentFile(b"broken"))
+
+        with self.assertLogs(level="ERROR"):
+            renditions_task("studx.Organization", self.org.pk)
+
+        self.assertEqual(
+            Organization.objects.get(pk=self.org.pk).picture_renditions, {}
+        )
+
+    def test_storage_errors_are_retried(self):
+        self.org.picture.save("pictures/picture.png", ContentFile(self.picture()))
+
+        with mock.patch.object(
+            default_storage, "open", side_effect=OSError
+        ), self.assertRaises(Retry):
+            renditions_task.apply(("studx.Organization", self.org.pk), throw=True)
+
+
+class EmailFlushTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.redis = get_redis()
+        self.redis.delete(QUEUE_KEY, PROCESSING_KEY, RETRY_KEY, FLUSH_LOCK_KEY)
+        patcher = mock.patch.object(flush_emails_task, "apply_async")
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def queue(self, *recipients: str):
+        for to in recipients:
+            email_task(
+                "Email verification",
+                to,
+                template_name="emails/verification.html",
+                template_context={"link": "https://studx.test", "username": to},
+            )
+
+    def stored(self, key: str) -> list[tuple[str, int]]:
+        return [
+            (email_msg["to"], email_msg["attempts"])
+            for email_msg in map(json.loads, self.redis.lrange(key, 0, -1))
+        ]
+
+    def flush(self, errors: dict[str, list[Exception]] | None = None):
+        """Flush the queue, sending each email after raising its `errors`, if any."""
+
+        errors = errors or {}
+        send_messages = EmailBackend.send_messages
+
+        def send(backend, messages):
+            if errors.get(messages[0].to[0]):
+                raise errors[messages[0].to[0]].pop(0)
+            return send_messages(backend, messages)
+
+        # Scheduled before the flush, it runs once the window is over
+        cache.clear()
+        with mock.patch.object(EmailBackend, "send_messages", send):
+            flush_emails_task()
+
+    def test_delivery(self):
+        self.queue("ada@studx.test", "alan@studx.test")
+
+        # A single flush is scheduled for the batch
+        self.apply_async.assert_called_once()
+
+        self.flush()
+
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [["ada@studx.test"], ["alan@studx.test"]],
+        )
+        for key in (QUEUE_KEY, PROCESSING_KEY, RETRY_KEY):
+            self.assertEqual(self.redis.llen(key), 0)
+
+    def test_failed_emails_are_retried_by_the_next_flush(self):
+        self.queue("ada@studx.test", "alan@studx.test")
+
+        with self.assertLogs(level="ERROR"):
+            self.flush({"ada@studx.test": [SMTPRecipientsRefused({})]})
+
+        self.assertEqual([message.to for message in mail.outbox], [["alan@studx.test"]])
+        self.assertEqual(self.stored(QUEUE_KEY), [("ada@studx.test", 1)])
+        self.apply_async.assert_called_with(countdown=10)
+
+        self.flush()
+
+        self.assertEqual(mail.outbox[-1].to, ["ada@studx.test"])
+        self.assertEqual(self.redis.llen(QUEUE_KEY), 0)
+
+    def test_emails_are_dropped_after_max_attempts(self):
+        self.queue("ada@studx.test")
+        email_msg = json.loads(self.redis.lpop(QUEUE_KEY))
+        email_msg["attempts"] = MAX_ATTEMPTS - 1
+        self.redis.rpush(QUEUE_KEY, json.dumps(email_msg))
+
+        with self.assertLogs(level="ERROR") as logs:
+            self.flush({"ada@studx.test": [SMTPRecipientsRefused({})]})
+
+        self.assertIn("Gave up sending email to ada@studx.test", logs.output[-1])
+        self.assertEqual(mail.outbox, [])
+        for key in (QUEUE_KEY, PROCESSING_KEY, RETRY_KEY):
+            self.assertEqual(self.redis.llen(key), 0)
+
+    def test_emails_of_a_dead_flush_are_sent(self):
+        self.queue("ada@studx.test", "alan@studx.test", "grace@studx.test")
+        # A flush died while sending its second batch, the first one failed
+        self.redis.rpush(RETRY_KEY, self.redis.lpop(QUEUE_KEY))
+        self.redis.rpush(PROCESSING_KEY, self.redis.lpop(QUEUE_KEY))
+
+        self.flush()
+
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [["ada@studx.test"], ["alan@studx.test"], ["grace@studx.test"]],
+        )
+        self.assertEqual(self.redis.llen(PROCESSING_KEY), 0)
+
+    def test_disconnections_are_retried_over_a_new_connection(self):
+        self.queue("ada@studx.test", "alan@studx.test")
+
+        with mock.patch.object(
+            EmailBackend, "open"
+        ) as open_connection, self.assertLogs(level="WARNING"):
+            self.flush({"ada@studx.test": [SMTPServerDisconnected()]})
+
+        self.assertEqual(open_connection.call_count, 2)
+        self.assertEqual(
+            [message.to for message in mail.outbox],
+            [["ada@studx.test"], ["alan@studx.test"]],
+        )
+        self.assertEqual(self.redis.llen(QUEUE_KEY), 0)
+
+    def test_concurrent_flushes_are_rescheduled(self):
+        self.queue("ada@studx.test")
+        self.redis.set(FLUSH_LOCK_KEY, "other")
+
+        self.flush()
+
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(self.stored(QUEUE_KEY), [("ada@studx.test", 0)])
+        self.assertEqual(self.apply_async.call_count, 2)
+
+
+class PushHubTests(TestCase):
+    def test_malformed_messages_are_dropped(self):
+        hub, queue = Hub(), asyncio.Queue()
+        hub.queues[1].add(queue)
+
+        with self.assertLogs("apps.studx.push", "WARNING") as logs:
+            for data in (b"not json", b"[]", b'{"verb": "added"}', b'"recipients"'):
+                hub.receive(data)
+        self.assertEqual(len(logs.output), 4)
+
+        # The messages after them are still dispatched
+        hub.receive(
+            json.dumps(
+                {"verb": "added", "timestamp": "now", "recipients": {"1": 7, "2": 8}}
+            )
+        )
+        self.assertEqual(
+            queue.get_nowait(), {"verb": "added", "timestamp": "now", "pk": 7}
+        )
+        self.assertTrue(queue.empty())
+
+
+class RequestMetricsTests(APITestCase):
+    def tearDown(self):
+        get_metrics_redis.cache_clear()
+
+    def test_requests_without_redis(self):
+        url = reverse("studx:orgs-list")
+
+        with self.settings(REDIS_URL=None):
+            get_metrics_redis.cache_clear()
+            self.assertIsNone(get_metrics_redis())
+            self.assertEqual(self.client.get(url).status_code, 401)
+
+        get_metrics_redis.cache_clear()
+        with mock.patch("core.metrics.logger") as logger, mock.patch.object(
+            get_metrics_redis(), "pipeline", side_effect=RedisTimeoutError
+        ):
+            self.assertEqual(self.client.get(url).status_code, 401)
+
+        logger.warning.assert_called_once()
+
+    def test_serialization_is_timed(self):
+        user = User.objects.create_user("teacher", "teacher@studx.com")
+        self.client.force_authenticate(user)
+        cache.clear()
+        get_metrics_redis().delete(METRICS_KEY)
+
+        with mock.patch("core.metrics.time.perf_counter", side_effect=count()):
+            self.client.get(reverse("studx:orgs-list"))
+
+        values = get_metrics_redis().hgetall(METRICS_KEY)
+        labels = 'view="studx:orgs-list",method="GET"'
+        field = f"studx_request_serialize_duration_seconds|{labels}|sum".encode()
+        self.assertGreater(float(values[field]), 0)
+
+
+class QueryBudgetMixin:
+    """Assertions on the query budgets of the views, see `core.metrics`."""
+
+    def assertWithinQueryBudget(self, method: str, url: str, **kwargs):
+        view_name = resolve(url).view_name
+        budget = get_query_budget(method.upper(), view_name)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, **kwargs)
+
+        self.assertLess(response.status_code, 500)
+        self.assertLessEqual(
+            len(queries),
+            budget,
+            f"{method.upper()} {url} ran {len(queries)} queries, "
+            f"over the budget of {view_name} ({budget})",
+        )
+        self.checked_views.add(view_name)
+
+        return response
+
+
+class QueryBudgetTests(QueryBudgetMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("teacher", "teacher@studx.com")
+        cls.student = User.objects.create_user("student", "student@studx.com")
+        cls.org = Organization.objects.create(name="School", created_by=cls.user)
+        OrganizationMembership.objects.bulk_create(
+            [
+                OrganizationMembership(
+                    org=cls.org, user=cls.user, role=OrganizationMembership.Role.ADMIN
+                ),
+                OrganizationMembership(org=cls.org, user=cls.student),
+            ]
+        )
+
+        cls.events = [
+            Event.objects.create(
+                title=f"Class {i}",
+                description="Class",
+                meeting_id=f"{uuid4()}",
+                starts_at=timezone.now() + timedelta(days=i),
+                ends_at=timezone.now() + timedelta(days=i, hours=1),
+                org=cls.org,
+                created_by=cls.user,
+            )
+            for i in range(5)
+        ]
+        for event in cls.events:
+            event.attendees.set([cls.user, cls.student])
+
+        cls.notifications = [
+            Notification.objects.create(
+                recipient=cls.user,
+                actor=cls.student,
+                verb="joined",
+                action_object=event,
+                target=cls.org,
+            )
+            for event in cls.events
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.checked_views = set()
+        self.client.force_authenticate(self.user)
+
+    def test_organization_endpoints(self):
+        slug = self.org.slug
+        picture = BytesIO()
+        Image.new("RGB", (8, 8)).save(picture, "PNG")
+        picture.name = "picture.png"
+
+        self.assertWithinQueryBudget("get", reverse("studx:orgs-list"))
+        self.assertWithinQueryBudget(
+            "post", reverse("studx:orgs-list"), data={"name": "College"}
+        )
+        self.assertWithinQueryBudget(
+            "get", reverse("studx:orgs-detail", kwargs={"slug": slug})
+        )
+        self.assertWithinQueryBudget(
+            "put",
+            reverse("studx:orgs-detail", kwargs={"slug": slug}),
+            data={"name": "High School", "about": "About"},
+        )
+        slug = Organization.objects.get(pk=self.org.pk).slug
+
+        with TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            self.assertWithinQueryBudget(
+                "post",
+                reverse("studx:orgs-picture", kwargs={"slug": slug}),
+                data={"image": picture},
+                format="multipart",
+            )
+
+        self.assertWithinQueryBudget(
+            "get", reverse("studx:orgs-members", kwargs={"slug": slug})
+        )
+        self.assertWithinQueryBudget(
+            "post",
+            reverse("studx:orgs-members", kwargs={"slug": slug}),
+            data={"username": "student", "role": "teacher"},
+        )
+        self.assertWithinQueryBudget(
+            "get",
+            reverse(
+                "studx:orgs-membership", kwargs={"slug": slug, "username": "student"}
+            ),
+        )
+
+        with mock.patch(
+            "apps.studx.views.organization.enqueue_add_members", return_value="job"
+        ), TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            self.assertWithinQueryBudget(
+                "post",
+                reverse("studx:orgs-add-members-in-bulk", kwargs={"slug": slug}),
+                data={"file": BytesIO(b"username,role\nstudent,student\n")},
+                format="multipart",
+            )
+
+        with mock.patch(
+            "apps.studx.views.organization.get_import_job", return_value=None
+        ):
+            self.assertWithinQueryBudget(
+                "get",
+                reverse(
+                    "studx:orgs-add-members-in-bulk-status",
+                    kwargs={"slug": slug, "job_id": f"{uuid4()}"},
+                ),
+            )
+
+        self.assertWithinQueryBudget(
+            "delete",
+            reverse(
+                "studx:orgs-membership", kwargs={"slug": slug, "username": "student"}
+            ),
+        )
+        self.assertWithinQueryBudget(
+            "post", reverse("studx:orgs-archive", kwargs={"slug": slug})
+        )
+        self.assertWithinQueryBudget(
+            "delete", reverse("studx:orgs-detail", kwargs={"slug": slug})
+        )
+
+    def test_events_endpoints(self):
+        kwargs = {"org_slug": self.org.slug}
+        event = self.events[0]
+
+        self.assertWithinQueryBudget("get", reverse("studx:events-list", kwargs=kwargs))
+        self.assertWithinQueryBudget(
+            "post",
+            reverse("studx:events-list", kwargs=kwargs),
+            data={
+                "title": "Physics",
+                "description": "Mechanics",
+                "attendees": "teacher,student",
+                "add_meeting_link": True,
+                "starts_at": timezone.now(),
+                "ends_at": timezone.now() + timedelta(hours=1),
+            },
+        )
+        self.assertWithinQueryBudget(
+            "get",
+            reverse(
+                "studx:events-event-by-meeting-id",
+                kwargs={**kwargs, "meeting_id": event.meeting_id},
+            ),
+        )
+        self.assertWithinQueryBudget(
+            "put", reverse("studx:events-detail", kwargs={**kwargs, "pk": event.pk})
+        )
+        self.assertWithinQueryBudget(
+            "delete", reverse("studx:events-detail", kwargs={**kwargs, "pk": event.pk})
+        )
+
+    def test_groups_endpoints(self):
+        kwargs = {"org_slug": self.org.slug}
+        group = OrganizationGroup.objects.create(org=self.org, name="Class A")
+        group.members.set([self.user, self.student])
+        detail = reverse("studx:groups-detail", kwargs={**kwargs, "pk": group.pk})
+
+        self.assertWithinQueryBudget("get", reverse("studx:groups-list", kwargs=kwargs))
+        self.assertWithinQueryBudget(
+            "post",
+            reverse("studx:groups-list", kwargs=kwargs),
+            data={"name": "Class B", "members": ["teacher", "student"]},
+        )
+        self.assertWithinQueryBudget("get", detail)
+        self.assertWithinQueryBudget(
+            "put", detail, data={"name": "Class C", "members": ["student"]}
+        )
+        self.assertWithinQueryBudget("delete", detail)
+
+    def test_notifications_endpoints(self):
+        pk = self.notifications[0].pk
+
+        for name in ("list", "unread", "unread-count", "read"):
+            self.assertWithinQueryBudget("get", reverse(f"studx:notifications-{name}"))
+
+        self.assertWithinQueryBudget(
+            "post", reverse("studx:notifications-mark-as-read", kwargs={"pk": pk})
+        )
+        self.assertWithinQueryBudget(
+            "post", reverse("studx:notifications-mark-all-as-read")
+        )
+        self.assertWithinQueryBudget(
+            "delete", reverse("studx:notifications-detail", kwargs={"pk": pk})
+        )
+        self.assertWithinQueryBudget(
+            "delete", reverse("studx:notifications-delete-all")
+        )
+
+    def test_calendar_endpoints(self):
+        response = self.assertWithinQueryBudget("get", reverse("studx:calendar-list"))
+        self.client.force_authenticate(None)
+        for url in (response.data["url"], response.data["orgs"][0]["url"]):
+            self.assertWithinQueryBudget("get", urlsplit(url).path)
+        self.client.force_authenticate(self.user)
+        self.assertWithinQueryBudget("post", reverse("studx:calendar-reset"))
+
+    def test_every_endpoint_has_its_budget_checked(self):
+        for test in (
+            self.test_organization_endpoints,
+            self.test_events_endpoints,
+            self.test_groups_endpoints,
+            self.test_notifications_endpoints,
+            self.test_calendar_endpoints,
+        ):
+            with self.subTest(test.__name__), transaction.atomic():
+                test()
+                transaction.set_rollback(True)
 
-# Create your tests here.
+        self.assertEqual(
+            self.checked_views,
+            {
+                f"studx:{url.name}"
+                for url in [*router.urls, *events_router.urls, *urlpatterns]
+                if getattr(url, "name", None)
+            },
+        )
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+
+class MaxSizeUploadHandler(FileUploadHandler):
+    """
+    Abort an upload as soon as one of its files exceeds `max_size` bytes.
+
+    It must come before the handlers storing the data, which it passes along.
+    """
+
+    def __init__(self, request=None, max_size: int = settings.MAX_UPLOAD_SIZE):
+        super().__init__(request)
+        self.max_size = max_size
+        self.exceeded = False
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.exceeded = True
+            raise StopUpload(connection_reset=True)
+
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
@@ -3,7 +3,9 @@ from rest_framework_nested import routers
 
 from apps.studx.views.notifications import NotificationsViewSet
 
+from .views.calendar import CalendarViewSet, calendar_feed
 from .views.events import EventsViewSet
+from .views.groups import GroupsViewSet
 from .views.organization import OrganizationViewSet
 
 app_name = "studx"
@@ -12,11 +14,14 @@ router = routers.SimpleRouter()
 
 router.register(r"orgs", OrganizationViewSet, basename="orgs")
 router.register(r"notifications", NotificationsViewSet, basename="notifications")
+router.register(r"calendar", CalendarViewSet, basename="calendar")
 
 events_router = routers.NestedSimpleRouter(router, r"orgs", lookup="org")
 events_router.register(r"events", EventsViewSet, basename="events")
+events_router.register(r"groups", GroupsViewSet, basename="groups")
 
 urlpatterns = [
+    path(r"calendar/<str:token>.ics", calendar_feed, name="calendar-feed"),
     path(r"", include(router.urls)),
     path(r"", include(events_router.urls)),
 ]
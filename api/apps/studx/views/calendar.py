@@ -0,0 +1,107 @@
+from django.db.models import Count, Max
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_safe
+from rest_framework import permissions, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from apps.auth.models import User
+from apps.studx.ical import decode_feed_token, get_feed_key, get_feed_token, stream_feed
+from apps.studx.models import Event, Organization
+
+# Events fetched per round trip while a feed is streamed
+FEED_CHUNK_SIZE = 500
+
+
+class CalendarViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request: Request):
+        """
+        Get the URLs of the iCalendar feeds of the user.
+
+        One feed has all their events, the others the events of one of their
+        organizations.
+        """
+
+        def get_url(org: Organization | None = None) -> str:
+            token = get_feed_token(request.user, org)
+
+            return request.build_absolute_uri(
+                reverse("studx:calendar-feed", kwargs={"token": token})
+            )
+
+        orgs = Organization.objects.filter(members=request.user).order_by("name")
+
+        return Response(
+            {
+                "url": get_url(),
+                "orgs": [{"slug": org.slug, "url": get_url(org)} for org in orgs],
+            }
+        )
+
+    @action(detail=False, methods=["POST"])
+    def reset(self, request: Request):
+        """Revoke the URLs of the feeds of the user."""
+
+        get_feed_key(request.user, reset=True)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@require_safe
+def calendar_feed(request, token: str):
+    """
+    Stream the events of a feed, as an iCalendar file.
+
+    Its ETag changes with the latest update and the number of its events: clients
+    polling an unchanged feed get a 304 without any event being rendered.
+    """
+
+    if (payload := decode_feed_token(token)) is None:
+        raise Http404()
+
+    user = User.objects.filter(pk=payload["calendar"], is_active=True).first()
+    if user is None or user.settings.get("calendar_key") != payload["key"]:
+        raise Http404()
+
+    events = Event.objects.visible_to(user)
+    name = user.username
+
+    if payload["org"] is not None:
+        org = Organization.objects.filter(pk=payload["org"], members=user).first()
+        if org is None:
+            raise Http404()
+        events = events.filter(org=org)
+        name = org.name
+
+    state = events.aggregate(updated_at=Max("updated_at"), count=Count("pk"))
+    updated_at = state["updated_at"].timestamp() if state["updated_at"] else 0
+    etag = f'"{state["count"]}-{updated_at}"'
+
+    if (response := get_conditional_response(request, etag=etag)) is None:
+        events = events.order_by("starts_at", "pk").only(
+            "title",
+            "description",
+            "starts_at",
+            "ends_at",
+            "recurrence",
+            "recurrence_exdates",
+            "created_at",
+            "updated_at",
+        )
+        response = StreamingHttpResponse(
+            stream_feed(
+                events.iterator(chunk_size=FEED_CHUNK_SIZE), name, request.get_host()
+            ),
+            content_type="text/calendar; charset=utf-8",
+        )
+
+    response["ETag"] = etag
+    # The feeds are personal, and must be revalidated on each poll
+    patch_cache_control(response, private=True, no_cache=True)
+
+    return response
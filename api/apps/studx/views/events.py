@@ -1,49 +1,110 @@
-from django.db.models import Q
+import heapq
+from operator import attrgetter
+from uuid import UUID
+
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch, Q, prefetch_related_objects
 from django.http import Http404
-from django.shortcuts import get_object_or_404
-from notifications.signals import notify
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.request import Request
 from rest_framework.response import Response
 
 from apps.studx.models import Event, Organization, OrganizationMembership
+from apps.studx.pagination import EventsPagination
+from apps.studx.recurrence import find_occurrence, get_occurrences
 from apps.studx.serializers import CreateEventSerializer, EventSerializer
+from tasks.notifications import notify_audience
+
+User = get_user_model()
 
 
 class EventsViewSet(viewsets.ViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def list(self, request: Request, org_slug: str):
-        return Response(
-            EventSerializer(
-                Event.objects.filter(
-                    Q(org__slug=org_slug)
-                    & (
-                        Q(created_by=request.user)
-                        | Q(attendees=request.user)
-                        | Q(attendees=None)
-                        # | Q(
-                        #     org__members=request.user,
-                        #     org__organizationmembership__role=OrganizationMembership.Role.ADMIN,
-                        # )
-                    )
-                ),
-                many=True,
-            ).data
+        """
+        List the occurrences of the events, in chronological order.
+
+        The occurrences of the recurring events are expanded on the fly, only within
+        the requested window and page.
+        """
+
+        window = {}
+
+        for param in ("starts_after", "ends_before"):
+            if (value := request.query_params.get(param)) is None:
+                window[param] = None
+                continue
+
+            try:
+                window[param] = parse_datetime(value)
+            except ValueError:
+                window[param] = None
+
+            if window[param] is None:
+                return Response(
+                    {param: ["Invalid datetime"]},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            if timezone.is_naive(window[param]):
+                window[param] = timezone.make_aware(window[param])
+
+        paginator = EventsPagination()
+        position, offset = paginator.get_position(request)
+        after = max(filter(None, (window["starts_after"], position)), default=None)
+        before = window["ends_before"]
+
+        events = Event.objects.filter(org__slug=org_slug).visible_to(request.user)
+        single = events.filter(recurrence=None).order_by(*paginator.ordering)
+        series = events.exclude(recurrence=None)
+
+        if after is not None:
+            single = single.filter(starts_at__gte=after)
+            series = series.filter(
+                Q(recurrence_until=None) | Q(recurrence_until__gte=after)
+            )
+        if before is not None:
+            single = single.filter(ends_at__lte=before)
+            series = series.filter(ends_at__lte=before)
+
+        # No more single events than the page, and the ones skipped by its cursor, can
+        # be needed. The series are expanded by as many occurrences at most.
+        single = list(single[: offset + paginator.page_size + 1])
+        series = list(series)
+        prefetch_related_objects(
+            [*single, *series],
+            Prefetch("attendees", queryset=User.objects.only("pk")),
         )
 
-    def create(self, request: Request, org_slug: str):
-        serializer = CreateEventSerializer(data=request.data)
+        occurrences = heapq.merge(
+            single,
+            *(get_occurrences(event, after, before) for event in series),
+            key=attrgetter(*paginator.ordering),
+        )
+        page = paginator.paginate_occurrences(occurrences)
+        serializer = EventSerializer(page, many=True)
+
+        return paginator.get_paginated_response(serializer.data)
 
+    def create(self, request: Request, org_slug: str):
         try:
             org = Organization.objects.get(slug=org_slug)
         except Organization.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
+        serializer = CreateEventSerializer(data=request.data, context={"org": org})
+
         if serializer.is_valid():
             event = serializer.save(created_by=request.user, org=org)
 
+            # A series is shown as its first occurrence, the way it is listed
+            if event.recurrence is not None:
+                event = next(get_occurrences(event), event)
+
             return Response(EventSerializer(event).data, status=status.HTTP_201_CREATED)
         else:
             return Response(status=status.HTTP_400_BAD_REQUEST)
@@ -63,14 +124,7 @@ class EventsViewSet(viewsets.ViewSet):
                 user=request.user, role=OrganizationMembership.Role.ADMIN
             ).exists()
         ):
-            for attendee in event.attendees.all():
-                notify.send(
-                    request.user,
-                    verb="removed the event",
-                    action_object=event,
-                    target=event.org,
-                    recipient=attendee,
-                )
+            notify_audience(request.user, "removed the event", event)
             event.delete()
 
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -82,18 +136,15 @@ class EventsViewSet(viewsets.ViewSet):
         methods=["GET"],
     )
     def event_by_meeting_id(self, request: Request, org_slug: str, meeting_id: str):
-        event = get_object_or_404(
-            Event, meeting_id__iexact=meeting_id, org__slug=org_slug
-        )
+        events = Event.objects.filter(org__slug=org_slug).visible_to(request.user)
+        # The meeting id of a series is not the one of any of its occurrences, which
+        # are not stored
+        event = events.filter(recurrence=None, meeting_id__iexact=meeting_id).first()
 
-        attendees = event.attendees.all()
-        print(attendees, event.created_by)
+        if event is None:
+            event = find_occurrence(events, f"{UUID(meeting_id)}")
 
-        if (
-            event.created_by != request.user
-            and len(attendees) > 0
-            and request.user not in attendees
-        ):
+        if event is None:
             raise Http404()
 
         return Response(EventSerializer(event).data, status=status.HTTP_200_OK)
@@ -0,0 +1,79 @@
+from django.db.models import Prefetch
+from rest_framework import permissions, status, viewsets
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from apps.auth.models import User
+from apps.studx.models import Organization, OrganizationGroup
+from apps.studx.permissions import IsOrgAdminOrMemberReadOnly
+
+from ..serializers import OrganizationGroupSerializer
+
+
+class GroupsViewSet(viewsets.ViewSet):
+    """The groups of an organization, managed by its admins."""
+
+    permission_classes = [permissions.IsAuthenticated, IsOrgAdminOrMemberReadOnly]
+
+    def get_queryset(self, org_slug: str):
+        return (
+            OrganizationGroup.objects.filter(org__slug=org_slug)
+            .prefetch_related(
+                Prefetch("members", queryset=User.objects.only("username"))
+            )
+            .order_by("name")
+        )
+
+    def list(self, request: Request, org_slug: str):
+        serializer = OrganizationGroupSerializer(self.get_queryset(org_slug), many=True)
+
+        return Response(serializer.data)
+
+    def create(self, request: Request, org_slug: str):
+        org = Organization.objects.get(slug=org_slug)
+        serializer = OrganizationGroupSerializer(
+            data=request.data, context={"org": org}
+        )
+
+        if serializer.is_valid():
+            group = serializer.save()
+            return Response(
+                OrganizationGroupSerializer(group).data,
+                status=status.HTTP_201_CREATED,
+            )
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def retrieve(self, request: Request, org_slug: str, pk: int):
+        try:
+            group = self.get_queryset(org_slug).get(pk=pk)
+        except OrganizationGroup.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        return Response(OrganizationGroupSerializer(group).data)
+
+    def update(self, request: Request, org_slug: str, pk: int, partial=False):
+        try:
+            group = self.get_queryset(org_slug).select_related("org").get(pk=pk)
+        except OrganizationGroup.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        serializer = OrganizationGroupSerializer(
+            group, data=request.data, partial=partial, context={"org": group.org}
+        )
+
+        if serializer.is_valid():
+            group = serializer.save()
+            return Response(OrganizationGroupSerializer(group).data)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    def partial_update(self, request: Request, org_slug: str, pk: int):
+        return self.update(request, org_slug, pk, partial=True)
+
+    def destroy(self, request: Request, org_slug: str, pk: int):
+        count, _ = OrganizationGroup.objects.filter(org__slug=org_slug, pk=pk).delete()
+
+        return Response(
+            status=status.HTTP_204_NO_CONTENT if count else status.HTTP_404_NOT_FOUND
+        )
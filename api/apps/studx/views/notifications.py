@@ -1,10 +1,14 @@
-from notifications.models import Notification
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from apps.studx.counters import (
+    get_unread_count,
+    incr_unread_counts,
+    set_unread_count,
+)
 from apps.studx.serializers import NotificationSerializer
 
 
@@ -28,6 +32,10 @@ class NotificationsViewSet(viewsets.ViewSet):
 
         return paginator.get_paginated_response(serializer.data)
 
+    @action(detail=False, url_path="unread-count")
+    def unread_count(self, request: Request):
+        return Response({"count": get_unread_count(request.user)})
+
     @action(detail=False)
     def read(self, request: Request):
         paginator = LimitOffsetPagination()
@@ -39,22 +47,26 @@ class NotificationsViewSet(viewsets.ViewSet):
 
     @action(detail=True, methods=["POST"])
     def mark_as_read(self, request: Request, pk: int):
-        if Notification.objects.filter(unread=True, pk=pk).update(unread=False):
+        if request.user.notifications.filter(unread=True, pk=pk).update(unread=False):
+            incr_unread_counts({request.user.pk: -1})
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     @action(detail=False, methods=["POST"])
     def mark_all_as_read(self, request: Request):
         request.user.notifications.all().mark_all_as_read()
+        set_unread_count(request.user.pk, 0)
         return Response(status=status.HTTP_202_ACCEPTED)
 
     def destroy(self, request: Request, pk: int):
-        if Notification.objects.filter(unread=True, pk=pk).delete():
+        count, _ = request.user.notifications.filter(unread=True, pk=pk).delete()
+        if count:
+            incr_unread_counts({request.user.pk: -count})
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(status=status.HTTP_404_NOT_FOUND)
 
     @action(detail=False, methods=["DELETE"])
     def delete_all(self, request: Request):
         request.user.notifications.all().delete()
-        print(request.user.notifications.all())
+        set_unread_count(request.user.pk, 0)
         return Response(status=status.HTTP_202_ACCEPTED)
@@ -1,20 +1,30 @@
 import uuid
-from pathlib import Path
 
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.db.models import Q
 from django.utils import timezone
-from notifications.signals import notify
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.request import Request
 from rest_framework.response import Response
 
+from apps.studx.cache import (
+    cache_key,
+    get_or_set,
+    invalidate_org,
+    invalidate_users,
+    org_scope,
+    user_scope,
+)
 from apps.studx.models import Event, Organization, OrganizationMembership
+from apps.studx.uploads import MaxSizeUploadHandler
 from core import settings
-from tasks.add_members import add_members
+from helpers.images import store_picture
+from tasks.add_members import enqueue_add_members, get_import_job
+from tasks.notifications import notify_users
 
 from ..serializers import (
     AddMemberSerializer,
@@ -33,14 +43,23 @@ class OrganizationViewSet(viewsets.ViewSet):
     lookup_field = "slug"
 
     def list(self, request: Request):
-        paginator = LimitOffsetPagination()
-        queryset = Organization.objects.filter(
-            deleted_at=None, archived_at=None, members=request.user
+        def get_page():
+            paginator = LimitOffsetPagination()
+            queryset = Organization.objects.filter(
+                deleted_at=None, archived_at=None, members=request.user
+            )
+            page = paginator.paginate_queryset(queryset, request)
+            serializer = OrganizationSerializer(page, many=True)
+
+            return paginator.get_paginated_response(serializer.data).data
+
+        key = cache_key(
+            "orgs",
+            user_scope(request.user.pk),
+            params=request.query_params.urlencode(),
         )
-        page = paginator.paginate_queryset(queryset, request)
-        serializer = OrganizationSerializer(page, many=True)
 
-        return paginator.get_paginated_response(serializer.data)
+        return Response(get_or_set(key, get_page))
 
     def create(self, request: Request):
         serializer = CreateOrganizationSerializer(data=request.data)
@@ -52,6 +71,7 @@ class OrganizationViewSet(viewsets.ViewSet):
                 user=request.user,
                 role=OrganizationMembership.Role.ADMIN,
             )
+            invalidate_users([request.user.pk])
             return Response(
                 OrganizationSerializer(organization).data,
                 status=status.HTTP_201_CREATED,
@@ -60,16 +80,25 @@ class OrganizationViewSet(viewsets.ViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def retrieve(self, request: Request, slug: str):
-        membership = (
-            request.user.org_membership.prefetch_related("org")
-            .filter(org__slug=slug)
-            .first()
-        )
+        def get_org():
+            membership = (
+                request.user.org_membership.prefetch_related("org")
+                .filter(org__slug=slug)
+                .first()
+            )
+
+            return (
+                None
+                if membership is None
+                else OrganizationSerializer(membership.org).data
+            )
+
+        key = cache_key("org", org_scope(slug), user_scope(request.user.pk))
 
         return (
             Response(status=status.HTTP_404_NOT_FOUND)
-            if membership is None
-            else Response(OrganizationSerializer(membership.org).data)
+            if (data := get_or_set(key, get_org)) is None
+            else Response(data)
         )
 
     def update(self, request: Request, slug: str):
@@ -79,6 +108,7 @@ class OrganizationViewSet(viewsets.ViewSet):
 
             if serializer.is_valid():
                 serializer.save()
+                invalidate_org(slug, members=True)
                 return Response(status=status.HTTP_204_NO_CONTENT)
 
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -89,11 +119,9 @@ class OrganizationViewSet(viewsets.ViewSet):
     def picture(self, request: Request, slug: str):
         try:
             org = Organization.objects.get(slug=slug)
-            org.picture.save(
-                f"{uuid.uuid4()}{Path(request.FILES['image'].name).suffix}",
-                request.FILES["image"],
-            )
+            store_picture(org.picture, request.FILES["image"])
             org.save()
+            invalidate_org(slug, members=True)
             return Response({"picture": org.picture.url}, status=status.HTTP_200_OK)
         except Organization.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
@@ -103,6 +131,7 @@ class OrganizationViewSet(viewsets.ViewSet):
         count = Organization.objects.filter(slug=slug).update(
             archived_at=timezone.now()
         )
+        invalidate_org(slug, members=True)
 
         return (
             Response(status=status.HTTP_204_NO_CONTENT)
@@ -112,6 +141,7 @@ class OrganizationViewSet(viewsets.ViewSet):
 
     def destroy(self, request: Request, slug: str):
         count = Organization.objects.filter(slug=slug).update(deleted_at=timezone.now())
+        invalidate_org(slug, members=True)
 
         return (
             Response(status=status.HTTP_204_NO_CONTENT)
@@ -125,12 +155,50 @@ class OrganizationViewSet(viewsets.ViewSet):
 
     @action(detail=True, url_path=r"members", methods=["GET"])
     def members(self, request: Request, slug: str):
-        paginator = LimitOffsetPagination()
-        queryset = OrganizationMembership.objects.filter(org__slug=slug)
-        page = paginator.paginate_queryset(queryset, request)
-        serializer = OrganizationMembersSerializer(page, many=True)
+        """
+        List the members of an organization, by username.
+
+        They can be filtered by `role`, and searched with `q` in their usernames,
+        names and emails.
+        """
+
+        query = request.query_params.get("q", "").strip()
+        role = request.query_params.get("role")
+
+        if role is not None and role not in OrganizationMembership.Role.values:
+            return Response(
+                {"role": ["Invalid role"]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        def get_page():
+            paginator = LimitOffsetPagination()
+            queryset = (
+                OrganizationMembership.objects.filter(org__slug=slug)
+                .select_related("user")
+                .order_by("user__username")
+            )
+
+            if role is not None:
+                queryset = queryset.filter(role=role)
+
+            if query:
+                queryset = queryset.filter(
+                    Q(user__username__icontains=query)
+                    | Q(user__first_name__icontains=query)
+                    | Q(user__last_name__icontains=query)
+                    | Q(user__email__icontains=query)
+                )
+
+            page = paginator.paginate_queryset(queryset, request)
+            serializer = OrganizationMembersSerializer(page, many=True)
+
+            return paginator.get_paginated_response(serializer.data).data
 
-        return paginator.get_paginated_response(serializer.data)
+        key = cache_key(
+            "members", org_scope(slug), params=request.query_params.urlencode()
+        )
+
+        return Response(get_or_set(key, get_page))
 
     @members.mapping.post
     def add_or_update_member(self, request: Request, slug: str):
@@ -144,27 +212,16 @@ class OrganizationViewSet(viewsets.ViewSet):
                     user=user,
                     defaults={"role": serializer.validated_data["role"]},
                 )
+                invalidate_org(slug)
+                invalidate_users([user.pk])
 
-                if created:
-                    notify.send(
-                        request.user,
-                        verb="added",
-                        action_object=User.objects.get(
-                            username=serializer.validated_data["username"]
-                        ),
-                        target=Organization.objects.get(slug=slug),
-                        recipient=User.objects.filter(organizations__slug=slug),
-                    )
-                else:
-                    notify.send(
-                        request.user,
-                        verb="changed the status of",
-                        action_object=User.objects.get(
-                            username=serializer.validated_data["username"]
-                        ),
-                        target=Organization.objects.get(slug=slug),
-                        recipient=User.objects.filter(organizations__slug=slug),
-                    )
+                notify_users(
+                    request.user,
+                    "added" if created else "changed the status of",
+                    org=org,
+                    action_object=user,
+                    target=org,
+                )
 
                 return Response(
                     OrganizationMembersSerializer(membership).data,
@@ -179,43 +236,84 @@ class OrganizationViewSet(viewsets.ViewSet):
 
     @action(detail=True, url_path=r"members/bulk", methods=["POST"])
     def add_members_in_bulk(self, request: Request, slug: str):
+        if not Organization.objects.filter(slug=slug).exists():
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        # Stream the upload to disk, then to the storage, chunk by chunk
+        limit = MaxSizeUploadHandler(request)
+        request.upload_handlers = [limit, TemporaryFileUploadHandler(request)]
+
+        if limit.exceeded or "file" not in request.FILES:
+            return Response(
+                {"file": ["Missing or too large file"]},
+                status=(
+                    status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                    if limit.exceeded
+                    else status.HTTP_400_BAD_REQUEST
+                ),
+            )
+
         file = request.FILES["file"]
-        filepath = default_storage.save(
-            f"{uuid.uuid4()}-{file.name}", ContentFile(file.read())
-        )
-        # TODO: Delay this after you're done
-        count_updated, count_created = add_members(slug, filepath)
+        filepath = default_storage.save(f"{uuid.uuid4()}-{file.name}", file)
+        job_id = enqueue_add_members(slug, filepath)
 
         return Response(
-            {"updated": count_updated, "created": count_created},
-            status=status.HTTP_201_CREATED,
+            {"job_id": job_id, "status": "queued"},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(
+        detail=True,
+        url_path=r"members/bulk/(?P<job_id>[a-f0-9-]+)",
+        methods=["GET"],
+    )
+    def add_members_in_bulk_status(self, request: Request, slug: str, job_id: str):
+        job = get_import_job(slug, job_id)
+
+        return (
+            Response(status=status.HTTP_404_NOT_FOUND)
+            if job is None
+            else Response(job, status=status.HTTP_200_OK)
         )
 
     @action(detail=True, url_path=r"membership/(?P<username>\w+)", methods=["GET"])
     def membership(self, request: Request, slug: str, username: str):
-        membership = OrganizationMembership.objects.filter(
-            org__slug=slug, user__username=username
-        ).first()
+        def get_membership():
+            membership = (
+                OrganizationMembership.objects.filter(
+                    org__slug=slug, user__username=username
+                )
+                .select_related("org", "user")
+                .first()
+            )
+
+            return (
+                None
+                if membership is None
+                else OrganizationMembershipSerializer(membership).data
+            )
+
+        key = cache_key("membership", org_scope(slug), params=username)
 
         return (
             Response(status=status.HTTP_404_NOT_FOUND)
-            if membership is None
-            else Response(OrganizationMembershipSerializer(membership).data)
+            if (data := get_or_set(key, get_membership)) is None
+            else Response(data)
         )
 
     @membership.mapping.delete
     def delete_membership(self, request: Request, slug: str, username: str):
-        count = OrganizationMembership.objects.filter(
-            user__username=username, org__name=slug
+        count, _ = OrganizationMembership.objects.filter(
+            user__username=username, org__slug=slug
         ).delete()
 
         if count:
-            notify.send(
-                request.user,
-                verb="removed",
-                action_object=User.objects.get(username=username),
-                target=Organization.objects.get(slug=slug),
-                recipient=User.objects.filter(organizations__slug=slug),
+            user = User.objects.get(username=username)
+            org = Organization.objects.get(slug=slug)
+            invalidate_org(slug)
+            invalidate_users([user.pk])
+            notify_users(
+                request.user, "removed", org=org, action_object=user, target=org
             )
 
         return Response(status=status.HTTP_202_ACCEPTED)
@@ -9,8 +9,27 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+# Sync views run in a thread pool under ASGI and connections are not shared across
+# threads, so persistent connections would leak one connection per thread.
+os.environ.setdefault("STUDX_DB_CONN_MAX_AGE", "0")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Served by `runserver` in development, which does not serve the notifications stream
+if settings.DEBUG:
+    django_application = ASGIStaticFilesHandler(django_application)
+
+# Imported once Django is set up, as it depends on the apps being loaded
+from apps.studx.push import STREAM_PATH, notifications_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["path"].rstrip("/") == STREAM_PATH:
+        return await notifications_stream(scope, receive, send)
+
+    return await django_application(scope, receive, send)
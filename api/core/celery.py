@@ -3,6 +3,9 @@ import os
 from celery import Celery
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+# The system checks load the URLs, hence all the views, in every worker. They are
+# already run by `manage.py` commands.
+os.environ.setdefault("CELERY_SKIP_CHECKS", "1")
 
 app = Celery("core")
 app.config_from_object("django.conf:settings", namespace="CELERY")
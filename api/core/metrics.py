@@ -0,0 +1,281 @@
+"""
+Per-view metrics of the API requests, exposed as Prometheus histograms.
+
+The observations of every process are aggregated in a single Redis hash, with one
+pipeline per request, so that any of them can serve the metrics of all of them. They
+are not recorded without Redis, nor when it does not answer within
+`METRICS_REDIS_TIMEOUT` seconds, rather than failing or delaying the requests.
+"""
+
+import hmac
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import cache, wraps
+
+import redis
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+METRICS_KEY = "studx:metrics"
+
+METRICS_REDIS_TIMEOUT = 0.1
+
+
+class Histogram:
+    """
+    A histogram stored in `METRICS_KEY`.
+
+    Each observation only increments its own bucket, the cumulative counts expected by
+    Prometheus are computed when the metrics are rendered.
+    """
+
+    def __init__(self, name: str, documentation: str, buckets: tuple[float, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = (*(f"{bucket}" for bucket in buckets), "+Inf")
+        self.bounds = buckets
+
+    def observe(self, pipeline, labels: str, value: float):
+        le = next(
+            (f"{bound}" for bound in self.bounds if value <= bound), self.buckets[-1]
+        )
+        pipeline.hincrby(METRICS_KEY, f"{self.name}|{labels}|{le}", 1)
+        pipeline.hincrbyfloat(METRICS_KEY, f"{self.name}|{labels}|sum", value)
+
+    def render(self, values: dict[str, str]) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        label_sets = sorted(
+            {
+                field.split("|")[1]
+                for field in values
+                if field.startswith(f"{self.name}|")
+            }
+        )
+
+        for labels in label_sets:
+            count = 0
+            for le in self.buckets:
+                count += int(values.get(f"{self.name}|{labels}|{le}", 0))
+                lines.append(f'{self.name}_bucket{{{labels},le="{le}"}} {count}')
+            total = values.get(f"{self.name}|{labels}|sum", 0)
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+
+        return lines
+
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_DURATION = Histogram(
+    "studx_request_duration_seconds", "Time spent handling a request.", SECONDS
+)
+REQUEST_QUERIES = Histogram(
+    "studx_request_queries",
+    "SQL queries run by a request.",
+    (0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_SQL_DURATION = Histogram(
+    "studx_request_sql_duration_seconds", "Time spent running SQL queries.", SECONDS
+)
+REQUEST_SERIALIZE_DURATION = Histogram(
+    "studx_request_serialize_duration_seconds",
+    "Time spent serializing the data of the response, queries included.",
+    SECONDS,
+)
+REQUEST_RENDER_DURATION = Histogram(
+    "studx_request_render_duration_seconds",
+    "Time spent rendering the response, once its data is serialized.",
+    SECONDS,
+)
+RESPONSE_SIZE = Histogram(
+    "studx_response_size_bytes",
+    "Size of the response bodies.",
+    (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+
+HISTOGRAMS = (
+    REQUEST_DURATION,
+    REQUEST_QUERIES,
+    REQUEST_SQL_DURATION,
+    REQUEST_SERIALIZE_DURATION,
+    REQUEST_RENDER_DURATION,
+    RESPONSE_SIZE,
+)
+
+
+@cache
+def get_metrics_redis() -> redis.Redis | None:
+    """Get the Redis client of the metrics, None if Redis is not configured."""
+
+    if not settings.REDIS_URL:
+        return None
+
+    return redis.Redis.from_url(
+        settings.REDIS_URL,
+        socket_timeout=METRICS_REDIS_TIMEOUT,
+        socket_connect_timeout=METRICS_REDIS_TIMEOUT,
+    )
+
+
+def get_query_budget(method: str, view_name: str) -> int:
+    """Maximum number of SQL queries expected from a request to a view."""
+
+    return settings.QUERY_BUDGETS.get(f"{method} {view_name}", settings.QUERY_BUDGET)
+
+
+@dataclass
+class RequestStats:
+    """Usage of the database by a request, collected by a database execute wrapper."""
+
+    queries: int = 0
+    sql_duration: float = 0
+    serialize_duration: float = 0
+    render_duration: float = 0
+    serializing: bool = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_duration += time.perf_counter() - start
+
+
+# The stats of the request being handled
+current_stats: ContextVar[RequestStats | None] = ContextVar(
+    "current_stats", default=None
+)
+
+
+def timed(data: property) -> property:
+    """Add the time spent in the `data` of the outermost serializers to the stats."""
+
+    @wraps(data.fget)
+    def get(serializer):
+        if (stats := current_stats.get()) is None or stats.serializing:
+            return data.fget(serializer)
+
+        stats.serializing = True
+        start = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            stats.serializing = False
+            stats.serialize_duration += time.perf_counter() - start
+
+    get.timed = True
+
+    return property(get)
+
+
+def time_serializers():
+    """Time the serializers of the requests, once per process."""
+
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(cls.__dict__["data"].fget, "timed", False):
+            cls.data = timed(cls.__dict__["data"])
+
+
+class RequestMetricsMiddleware:
+    """
+    Record the metrics of each request, labeled with its resolved view.
+
+    Requests running more queries than the budget of their view are logged.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        time_serializers()
+
+    def __call__(self, request):
+        request.stats = stats = RequestStats()
+        token = current_stats.set(stats)
+        start = time.perf_counter()
+
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+
+        duration = time.perf_counter() - start
+        view_name = (
+            "unresolved"
+            if request.resolver_match is None
+            else request.resolver_match.view_name
+        )
+
+        if stats.queries > (budget := get_query_budget(request.method, view_name)):
+            logger.warning(
+                "%s %s ran %d queries, over the budget of %d (%s)",
+                request.method,
+                request.path,
+                stats.queries,
+                budget,
+                view_name,
+            )
+
+        if (client := get_metrics_redis()) is None:
+            return response
+
+        labels = f'view="{view_name}",method="{request.method}"'
+        try:
+            pipeline = client.pipeline(transaction=False)
+            REQUEST_DURATION.observe(pipeline, labels, duration)
+            REQUEST_QUERIES.observe(pipeline, labels, stats.queries)
+            REQUEST_SQL_DURATION.observe(pipeline, labels, stats.sql_duration)
+            REQUEST_SERIALIZE_DURATION.observe(
+                pipeline, labels, stats.serialize_duration
+            )
+            REQUEST_RENDER_DURATION.observe(pipeline, labels, stats.render_duration)
+            if not response.streaming:
+                RESPONSE_SIZE.observe(pipeline, labels, len(response.content))
+            pipeline.execute()
+        except Exception as exc:
+            logger.warning("Could not record the metrics of %s: %r", view_name, exc)
+
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before DRF responses are rendered
+        start = time.perf_counter()
+
+        def rendered(response):
+            request.stats.render_duration = time.perf_counter() - start
+
+        response.add_post_render_callback(rendered)
+
+        return response
+
+
+def metrics_view(request):
+    """Serve the metrics to a scraper authenticated with `METRICS_TOKEN`."""
+
+    keyword, _, token = request.headers.get("Authorization", "").partition(" ")
+
+    if not settings.METRICS_TOKEN or not (
+        keyword == "Bearer" and hmac.compare_digest(token, settings.METRICS_TOKEN)
+    ):
+        raise Http404()
+
+    client = get_metrics_redis()
+    fields = {} if client is None else client.hgetall(METRICS_KEY)
+    values = {field.decode(): value.decode() for field, value in fields.items()}
+    lines = [line for histogram in HISTOGRAMS for line in histogram.render(values)]
+
+    return HttpResponse(
+        "\n".join(lines) + "\n", content_type="text/plain; version=0.0.4"
+    )
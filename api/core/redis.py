@@ -0,0 +1,11 @@
+from functools import cache
+
+import redis
+from django.conf import settings
+
+
+@cache
+def get_redis() -> redis.Redis:
+    """Get the Redis client shared by the current process."""
+
+    return redis.Redis.from_url(settings.REDIS_URL)
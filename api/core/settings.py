@@ -39,6 +39,7 @@ if DEBUG:
 INSTALLED_APPS = FIRST_PARTY_APPS + DEFAULT_APPS + THIRD_PARTY_APPS
 
 MIDDLEWARE = [
+    "core.metrics.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -82,8 +83,10 @@ DATABASES = {
         "PORT": os.getenv("STUDX_DB_PORT"),
         "ATOMIC_REQUESTS": False,
         "AUTOCOMMIT": True,
-        "CONN_MAX_AGE": 0,
-        "CONN_HEALTH_CHECKS": False,
+        # Persistent connections, one per process (or thread), checked before reuse.
+        # Set it to 0 behind an external pooler, or when serving through ASGI.
+        "CONN_MAX_AGE": int(os.getenv("STUDX_DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
         "OPTIONS": {},
         "TIME_ZONE": "UTC",
     }
@@ -107,6 +110,16 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+    # Used for bulk-provisioned accounts, upgraded on first login
+    "apps.auth.hashers.ProvisionalPasswordHasher",
+]
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.1/topics/i18n/
 
@@ -127,6 +140,9 @@ STATIC_ROOT = BASE_DIR / "static"
 MEDIA_ROOT = BASE_DIR / "media"
 MEDIA_URL = "media/"
 
+# Maximum size, in bytes, of the uploaded files which are streamed to the storage
+MAX_UPLOAD_SIZE = int(os.getenv("STUDX_MAX_UPLOAD_SIZE", 50 * 1024 * 1024))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
 
@@ -136,11 +152,11 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "studx_auth.User"
 
 REST_FRAMEWORK = {
-    "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_SCHEMA_CLASS": "apps.auth.openapi.AutoSchema",
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 100,
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "knox.auth.TokenAuthentication",
+        "apps.auth.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_RENDERER_CLASSES": [
         "djangorestframework_camel_case.render.CamelCaseJSONRenderer",
@@ -168,13 +184,66 @@ SPECTACULAR_SETTINGS = {
 # Django notifications
 DJANGO_NOTIFICATIONS_CONFIG = {"USE_JSONFIELD": True}
 
+# Redis
+REDIS_URL = os.getenv("STUDX_REDIS_URL")
+
+# Cache
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+        "KEY_PREFIX": "studx",
+    }
+}
+
+# Keeps the cache of the tests in memory, and their Redis clients off the real one
+TEST_RUNNER = "core.testing.TestRunner"
+
+# Seconds during which a validated auth token is trusted without hitting the DB
+AUTH_CACHE_TTL = int(os.getenv("STUDX_AUTH_CACHE_TTL", 60))
+
+# Requests running more SQL queries than the budget of their view are logged
+QUERY_BUDGET = int(os.getenv("STUDX_QUERY_BUDGET", 10))
+
+# By "<method> <view name>". The listings must run a constant number of queries,
+# whatever their page size.
+QUERY_BUDGETS = {
+    "GET studx:orgs-list": 4,
+    "GET studx:orgs-members": 4,
+    "GET studx:events-list": 4,
+    "GET studx:groups-list": 4,
+    "GET studx:notifications-list": 8,
+    "GET studx:notifications-unread": 8,
+}
+
+# Bearer token of the metrics scraper, the metrics are not served without one
+METRICS_TOKEN = os.getenv("STUDX_METRICS_TOKEN")
+
 # Celery settings
-CELERY_BROKER_URL = os.getenv("STUDX_REDIS_URL")
+CELERY_BROKER_URL = REDIS_URL
+
+CELERY_RESULT_BACKEND = REDIS_URL
 
-CELERY_RESULT_BACKEND = os.getenv("STUDX_REDIS_URL")
+# Store the arguments of the tasks with their results, the status of the bulk imports
+# is only served to the organization they were enqueued for, whatever their state.
+CELERY_RESULT_EXTENDED = True
 
 CELERY_IMPORTS = ("tasks",)
 
+# Long imports and picture processing run on their own workers (`-Q bulk`), so that
+# they never delay the emails and notifications queued behind them.
+CELERY_TASK_DEFAULT_QUEUE = "default"
+
+CELERY_TASK_ROUTES = {
+    "tasks.email.*": {"queue": "email"},
+    "tasks.add_members.*": {"queue": "bulk"},
+    "tasks.pictures.*": {"queue": "bulk"},
+}
+
+# Reserve one task at a time, so that a worker busy with a long task does not hold
+# others which idle workers could run.
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
 # JWT Settings
 JWT_ALGORITHMS = ["HS256"]
 
@@ -0,0 +1,48 @@
+from unittest import mock
+
+import fakeredis
+import redis
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+from core.metrics import get_metrics_redis
+from core.redis import get_redis
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Run the tests away from the Redis of the environment, which also holds the
+    queues, the counters and the metrics.
+
+    The cache is kept in the memory of the test process, the tests clear it freely.
+    The other Redis clients talk to a fake server, shared by the whole run.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+
+        self.redis = fakeredis.FakeServer()
+        self.overrides = override_settings(
+            CACHES={
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+            },
+            REDIS_URL="redis://localhost:6379/0",
+        )
+        self.from_url = mock.patch.object(
+            redis.Redis, "from_url", self.fake_redis_from_url
+        )
+        self.overrides.enable()
+        self.from_url.start()
+        get_redis.cache_clear()
+        get_metrics_redis.cache_clear()
+
+    def teardown_test_environment(self, **kwargs):
+        self.from_url.stop()
+        self.overrides.disable()
+        get_redis.cache_clear()
+        get_metrics_redis.cache_clear()
+
+        super().teardown_test_environment(**kwargs)
+
+    def fake_redis_from_url(self, url: str, **kwargs) -> fakeredis.FakeRedis:
+        return fakeredis.FakeRedis.from_url(url, server=self.redis, **kwargs)
@@ -1,25 +1,50 @@
 """core URL Configuration"""
 
+from functools import cache
+
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularRedocView,
-    SpectacularSwaggerView,
-)
+from django.views.decorators.csrf import csrf_exempt
 
 from . import settings
+from .metrics import metrics_view
+
+
+@cache
+def get_schema_view(name: str, url_name: str | None = None):
+    # The schema machinery is heavy and only needed by the docs, don't load it upfront
+    from drf_spectacular import views
+
+    return getattr(views, name).as_view(
+        **({} if url_name is None else {"url_name": url_name})
+    )
+
+
+def schema_view(name: str, url_name: str | None = None):
+    """Resolve a drf_spectacular view on its first request."""
+
+    @csrf_exempt
+    def view(request, *args, **kwargs):
+        return get_schema_view(name, url_name)(request, *args, **kwargs)
+
+    return view
+
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
+    path("metrics/", metrics_view, name="metrics"),
+    path("api/schema/", schema_view("SpectacularAPIView"), name="schema"),
     path(
         "api/swagger/",
-        SpectacularSwaggerView.as_view(url_name="schema"),
+        schema_view("SpectacularSwaggerView", url_name="schema"),
         name="swagger",
     ),
-    path("api/redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc"),
+    path(
+        "api/redoc/",
+        schema_view("SpectacularRedocView", url_name="schema"),
+        name="redoc",
+    ),
     path("api/auth/", include("apps.auth.urls")),
     path("api/", include("apps.studx.urls")),
 ]
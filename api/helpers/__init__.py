@@ -1,20 +1,43 @@
-from uuid import uuid4
+from itertools import count
 
 from django.db import models
+from django.utils.crypto import get_random_string
 from django.utils.text import slugify
 
+# Characters of the random slugs of the fields without any slugifiable character
+SLUG_CHARS = "abcdefghijklmnopqrstuvwxyz0123456789"
+
 
 def generate_slug(instance: models.Model, from_field: str, slug_field: str = "slug"):
     """Generate a slug
 
     The slug is generated, based on a model field and checked against a given slug field.
-    Inspired by https://studygyaan.com/django/how-to-create-a-unique-slug-in-django.
+    All the slugs it may collide with are fetched in a single query, and the first free
+    numeric suffix (`-2`, `-3`, ...) is picked. A field without any character left once
+    slugified gets a random slug, which would otherwise collide with every slug.
     """
 
-    base_slug = slugify(getattr(instance, from_field), allow_unicode=False)
-    slug = base_slug
+    base_slug = slugify(
+        getattr(instance, from_field), allow_unicode=False
+    ) or get_random_string(8, SLUG_CHARS)
+
+    if max_length := instance._meta.get_field(slug_field).max_length:
+        # Leave room for a suffix
+        base_slug = base_slug[: max_length - 8]
+
+    taken = set(
+        instance.__class__._default_manager.filter(
+            **{f"{slug_field}__startswith": base_slug}
+        )
+        .exclude(pk=instance.pk)
+        .values_list(slug_field, flat=True)
+    )
 
-    while instance.__class__.objects.filter(**{f"{slug_field}": slug}):
-        slug = f"{base_slug}-${str(uuid4())[9:18]}"
+    if base_slug not in taken:
+        return base_slug
 
-    return slug
+    return next(
+        slug
+        for slug in (f"{base_slug}-{suffix}" for suffix in count(2))
+        if slug not in taken
+    )
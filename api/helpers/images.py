@@ -0,0 +1,144 @@
+import hashlib
+import warnings
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.db import models, transaction
+from django.db.models.fields.files import FieldFile
+from rest_framework import serializers
+
+PICTURES_DIR = "pictures"
+
+# Largest side, in pixels, of each rendition
+RENDITIONS = {"small": 64, "medium": 256}
+
+
+class InvalidPicture(Exception):
+    """An image which can not be decoded."""
+
+
+@contextmanager
+def open_image(file):
+    """
+    Open an image, refusing the decompression bombs.
+
+    PIL only warns about the images between `MAX_IMAGE_PIXELS` and twice as many
+    pixels, they are refused too.
+
+    :raises InvalidPicture: If the image can not be decoded, when opened or within
+        the block.
+    """
+
+    from PIL import Image
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", Image.DecompressionBombWarning)
+            with Image.open(file) as image:
+                yield image
+    except (
+        OSError,
+        SyntaxError,
+        ValueError,
+        Image.DecompressionBombError,
+        Image.DecompressionBombWarning,
+    ) as error:
+        raise InvalidPicture() from error
+
+
+def store_picture(field: FieldFile, upload: File):
+    """Store an uploaded picture under the hash of its content.
+
+    Uploading a picture which is already stored reuses the existing file.
+    The instance is not saved.
+
+    :raises serializers.ValidationError: If the upload is not an image.
+    """
+
+    # Only its headers are read, the renditions decode it
+    try:
+        with open_image(upload) as image:
+            image.verify()
+    except InvalidPicture:
+        raise serializers.ValidationError({"image": ["Not a valid image"]})
+
+    upload.seek(0)
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+
+    name = f"{PICTURES_DIR}/{digest.hexdigest()}{Path(upload.name).suffix.lower()}"
+
+    if default_storage.exists(name):
+        field.name = name
+    else:
+        upload.seek(0)
+        field.save(name, upload, save=False)
+
+
+def generate_renditions(name: str) -> dict[str, str]:
+    """Generate the WebP renditions of a stored picture.
+
+    :return: The name of the stored file of each rendition.
+    :raises InvalidPicture: If the picture can not be decoded.
+    :raises OSError: If the storage fails.
+    """
+
+    # Loaded here, as only the workers need it
+    from PIL import ImageOps
+
+    renditions = {}
+
+    # Read at once, so that the errors of the storage are told apart from the ones
+    # of the decoding
+    with default_storage.open(name) as file:
+        content = file.read()
+
+    with open_image(BytesIO(content)) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    for rendition, size in RENDITIONS.items():
+        renditions[rendition] = f"{Path(name).with_suffix('')}-{size}.webp"
+        if default_storage.exists(renditions[rendition]):
+            continue
+
+        thumbnail = image.copy()
+        thumbnail.thumbnail((size, size))
+        buffer = BytesIO()
+        thumbnail.save(buffer, "WEBP", quality=80)
+        default_storage.save(renditions[rendition], ContentFile(buffer.getvalue()))
+
+    return renditions
+
+
+def schedule_renditions(sender, instance: models.Model, **kwargs):
+    """Generate the renditions of the `picture` of an instance, once it changed.
+
+    The instance must have a `picture_renditions` JSON field, which records the
+    picture its renditions were generated from.
+    """
+
+    from tasks.pictures import renditions_task
+
+    if (
+        instance.picture
+        and instance.picture_renditions.get("source") != instance.picture.name
+    ):
+        transaction.on_commit(
+            lambda: renditions_task.delay(sender._meta.label, instance.pk)
+        )
+
+
+class PictureRenditionsField(serializers.ReadOnlyField):
+    """The URLs of the renditions of a picture."""
+
+    def to_representation(self, value):
+        return {
+            rendition: default_storage.url(value[rendition])
+            for rendition in RENDITIONS
+            if rendition in value
+        }
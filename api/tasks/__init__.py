@@ -1 +1,4 @@
-from .email import email_task
+from .add_members import add_members
+from .email import email_task, flush_emails_task
+from .notifications import notify_task
+from .pictures import renditions_task
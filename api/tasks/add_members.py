@@ -1,27 +1,158 @@
-import polars as pl
+import csv
+import io
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import Any
+from uuid import uuid4
+
+from celery import Task, states
 from celery.utils.log import logging
+from celery.utils.time import get_exponential_backoff_interval
 from django.contrib.auth.hashers import make_password
+from django.core.files.storage import default_storage
+from django.db import transaction
 
+from apps.auth.hashers import ProvisionalPasswordHasher
 from apps.auth.models import User
+from apps.studx.cache import invalidate_org, invalidate_users
 from apps.studx.models import Organization, OrganizationMembership
-from core import settings
 from core.celery import app
 
+CHUNK_SIZE = 1000
+
+# Custom states reported by the import jobs, on top of Celery's built-in ones
+QUEUED = "QUEUED"
+PROGRESS = "PROGRESS"
+
+JOB_STATUSES = {
+    QUEUED: "queued",
+    states.STARTED: "running",
+    PROGRESS: "running",
+    states.RETRY: "running",
+    states.SUCCESS: "done",
+    states.FAILURE: "failed",
+}
+
+
+def read_chunks(
+    filepath: str, size: int = CHUNK_SIZE
+) -> Iterator[tuple[int, dict[str, str]]]:
+    """
+    Lazily read a members CSV file, `size` rows at a time.
 
-@app.task(
-    autoretry_for=(Exception,),
-    retry_backoff=True,
-    retry_kwargs={"max_retries": 10},
-)
-def add_members(organization_slug: str, filepath: str) -> tuple[int, int]:
+    Each chunk is yielded with its number of rows, as a mapping of username to role.
+    The first column holds the usernames and the second one the roles, whatever their
+    headers are. Duplicated usernames inside a chunk are collapsed, the last row
+    winning, and missing roles default to student.
+    """
+
+    with default_storage.open(filepath, "rb") as file:
+        reader = csv.reader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+        # The header
+        next(reader, None)
+
+        while rows := list(islice(reader, size)):
+            yield len(rows), {
+                row[0].strip(): (
+                    row[1].strip().lower()
+                    if len(row) > 1 and row[1].strip()
+                    else OrganizationMembership.Role.STUDENT
+                )
+                for row in rows
+                if row and row[0].strip()
+            }
+
+
+def invalidate_members(org: Organization, user_ids: Iterable[int]):
+    invalidate_org(org.slug)
+    invalidate_users(user_ids)
+
+
+def import_chunk(org: Organization, roles: dict[str, str]) -> tuple[int, int]:
+    """
+    Upsert the memberships of a chunk of users with a constant number of queries.
+
+    :param org: The organization the users are added to.
+    :param roles: A mapping of username to role.
+    :return: The number of memberships updated and created.
+    """
+
+    usernames = list(roles)
+    user_ids = dict(
+        User.objects.filter(username__in=usernames).values_list("username", "pk")
+    )
+
+    if missing := [username for username in usernames if username not in user_ids]:
+        User.objects.bulk_create(
+            [
+                User(
+                    username=username,
+                    password=make_password(
+                        f"{username}", hasher=ProvisionalPasswordHasher.algorithm
+                    ),
+                )
+                for username in missing
+            ],
+            ignore_conflicts=True,
+        )
+        # Conflicting rows are skipped and no primary key is set with `ignore_conflicts`
+        user_ids.update(
+            User.objects.filter(username__in=missing).values_list("username", "pk")
+        )
+
+    existing = set(
+        OrganizationMembership.objects.filter(
+            org=org, user_id__in=user_ids.values()
+        ).values_list("user_id", flat=True)
+    )
+
+    OrganizationMembership.objects.bulk_create(
+        [
+            OrganizationMembership(org=org, user_id=user_id, role=roles[username])
+            for username, user_id in user_ids.items()
+        ],
+        update_conflicts=True,
+        unique_fields=("org", "user"),
+        update_fields=("role",),
+    )
+
+    transaction.on_commit(lambda: invalidate_members(org, user_ids.values()))
+
+    return len(existing), len(user_ids) - len(existing)
+
+
+@app.task(bind=True, acks_late=True, max_retries=10)
+def add_members(
+    self: Task,
+    organization_slug: str,
+    filepath: str,
+    progress: dict[str, Any] | None = None,
+) -> dict[str, Any] | None:
     """
     Add members to Organization in bulk.
 
+    The progress is published after each chunk under the `PROGRESS` state. A retried
+    or redelivered job resumes after the chunks it already imported, so that they are
+    neither imported nor counted twice.
+
     :param organization_slug: The slug of the corresponding organization.
-    :param filepath: The name of the CSV file to pick from settings.MEDIA_ROOT for the operation.
+    :param filepath: The name of the CSV file in the default storage.
+    :param progress: The progress of the previous attempt, set on retries.
+    :return: The number of rows processed, memberships updated and created.
     """
 
-    count_updated, count_created = 0, 0
+    if progress is None and self.request.id is not None:
+        # A job redelivered after its worker died has published its progress
+        progress = self.AsyncResult(self.request.id).info
+
+    if not isinstance(progress, dict) or "chunks" not in progress:
+        progress = {
+            "org": organization_slug,
+            "chunks": 0,
+            "processed": 0,
+            "updated": 0,
+            "created": 0,
+        }
 
     try:
         org = Organization.objects.get(slug=organization_slug)
@@ -29,29 +160,66 @@ def add_members(organization_slug: str, filepath: str) -> tuple[int, int]:
         logging.error("No such Organization: Organization(%s)", organization_slug)
         return
 
-    df = pl.read_csv(settings.MEDIA_ROOT / filepath)
-
-    for row in df.iter_rows(named=False):
-        print("iter")
-        [username, role] = row
+    try:
+        for rows, roles in islice(read_chunks(filepath), progress["chunks"], None):
+            with transaction.atomic():
+                updated, created = import_chunk(org, roles)
 
-        user, _ = User.objects.get_or_create(
-            username=username,
-            defaults={
-                "username": username,
-                "password": make_password(f"{username}"),
-            },
+            progress["chunks"] += 1
+            progress["processed"] += rows
+            progress["updated"] += updated
+            progress["created"] += created
+            self.update_state(state=PROGRESS, meta=progress)
+    except Exception as exc:
+        raise self.retry(
+            exc=exc,
+            kwargs={"progress": progress},
+            countdown=get_exponential_backoff_interval(
+                factor=1, retries=self.request.retries, maximum=600, full_jitter=True
+            ),
         )
 
-        _, created = OrganizationMembership.objects.update_or_create(
-            org=org,
-            user=user,
-            defaults={"user": user, "org": org, "role": role.lower()},
-        )
+    return progress
+
+
+def enqueue_add_members(organization_slug: str, filepath: str) -> str:
+    """
+    Schedule a bulk import and return the id of the job.
+
+    The job is marked as queued before being sent, so that it can be told apart from
+    an unknown one (which Celery reports as `PENDING` too).
+    """
+
+    job_id = f"{uuid4()}"
+    app.backend.store_result(job_id, {"org": organization_slug, "processed": 0}, QUEUED)
+    add_members.apply_async((organization_slug, filepath), task_id=job_id)
+
+    return job_id
+
+
+def get_import_job(organization_slug: str, job_id: str) -> dict[str, Any] | None:
+    """
+    Get the status of a bulk import job of an organization.
+
+    :return: None if the job does not exist, or belongs to another organization.
+    """
+
+    result = add_members.AsyncResult(job_id)
+
+    if (status := JOB_STATUSES.get(result.state)) is None:
+        return None
 
-        if created:
-            count_created += 1
-        else:
-            count_updated += 1
+    # Failures and retries carry the raised exception instead of the progress, their
+    # organization is then read from the arguments of the job (`result_extended`)
+    info = result.info if isinstance(result.info, dict) else {}
+    org = info.get("org") or next(iter(result.args or ()), None)
+    if org != organization_slug:
+        return None
 
-    return count_updated, count_created
+    return {
+        "job_id": job_id,
+        "status": status,
+        "processed": info.get("processed", 0),
+        "updated": info.get("updated"),
+        "created": info.get("created"),
+    }
@@ -1,18 +1,53 @@
-from celery import Task
-from django.core.mail import EmailMessage
+import json
+from smtplib import SMTPServerDisconnected
+
+from celery.utils.log import logging
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
 from django.template.loader import render_to_string
+from redis import Redis
+from redis.exceptions import LockError
 
 from core.celery import app
+from core.redis import get_redis
+
+QUEUE_KEY = "studx:emails:queue"
+# The batch being sent, and the emails to send again, until the flush sending them
+# is done. A flush that died meanwhile leaves them for the next one.
+PROCESSING_KEY = "studx:emails:processing"
+RETRY_KEY = "studx:emails:retry"
+
+# Only one flush runs at a time. Its lock expires if it makes no progress for
+# `FLUSH_LOCK_TTL` seconds, e.g. because its worker died.
+FLUSH_LOCK_KEY = "studx:emails:flush"
+FLUSH_LOCK_TTL = 5 * 60
+
+# Seconds during which queued emails are accumulated before being sent together
+BATCH_WINDOW = 2
+BATCH_SIZE = 100
+
+MAX_ATTEMPTS = 10
+
+# Move up to ARGV[1] emails from the head of KEYS[1] to the tail of KEYS[2] and return
+# them, atomically. A script works with any Redis version, `LPOP` of several items
+# and `LMOVE` need Redis 6.2.
+TAKE_BATCH = """
+local batch = redis.call("LRANGE", KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #batch > 0 then
+    redis.call("LTRIM", KEYS[1], #batch, -1)
+    redis.call("RPUSH", KEYS[2], unpack(batch))
+end
+return batch
+"""
 
 
 @app.task(
-    bind=True,
+    ignore_result=True,
     autoretry_for=(Exception,),
     retry_backoff=True,
     retry_kwargs={"max_retries": 10},
 )
 def email_task(
-    self: Task,
     subject: str,
     to: str,
     content: str | None = None,
@@ -21,7 +56,7 @@ def email_task(
     from_email: str | None = None,
     mime: str = "html",
 ):
-    """Send an email_msg following a given template"""
+    """Queue an email_msg following a given template, to be sent in the next batch"""
 
     email_content = (
         content or render_to_string(template_name, template_context)
@@ -31,10 +66,130 @@ def email_task(
     if not email_content:
         return
 
-    email_msg = EmailMessage(
-        subject=subject, body=email_content, to=(to,), from_email=from_email
-    )
-    email_msg.content_subtype = mime
+    email_msg = {
+        "subject": subject,
+        "body": email_content,
+        "to": to,
+        "from_email": from_email,
+        "mime": mime,
+        "attempts": 0,
+    }
+    get_redis().rpush(QUEUE_KEY, json.dumps(email_msg))
+    schedule_flush()
+
+
+def schedule_flush(countdown: int = BATCH_WINDOW):
+    """Schedule a flush of the queue, unless one is already pending."""
+
+    if cache.add("emails:flush-scheduled", 1, countdown):
+        flush_emails_task.apply_async(countdown=countdown)
+
+
+@app.task(
+    ignore_result=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 10},
+)
+def flush_emails_task():
+    """
+    Send the queued emails over a single SMTP connection, in batches.
+
+    Emails which could not be sent are queued again, up to `MAX_ATTEMPTS` times. The
+    delivery is at-least-once: an email stays in Redis until it is sent, and the ones
+    of a batch interrupted midway are all sent again by the next flush.
+    """
+
+    redis = get_redis()
+    lock = redis.lock(FLUSH_LOCK_KEY, timeout=FLUSH_LOCK_TTL)
+
+    if not lock.acquire(blocking=False):
+        # The running flush may not see the emails queued after its last batch
+        schedule_flush()
+        return
+
+    try:
+        # Left by a flush which died
+        requeue(redis, PROCESSING_KEY)
+        requeue(redis, RETRY_KEY)
+
+        with get_connection() as connection:
+            while batch := redis.eval(
+                TAKE_BATCH, 2, QUEUE_KEY, PROCESSING_KEY, BATCH_SIZE
+            ):
+                failed = send_batch(connection, map(json.loads, batch))
+
+                with redis.pipeline() as pipe:
+                    if failed:
+                        pipe.rpush(RETRY_KEY, *failed)
+                    pipe.delete(PROCESSING_KEY)
+                    pipe.execute()
+
+                lock.reacquire()
+
+        # Only sent by the next flush, rather than over and over by this one
+        if requeue(redis, RETRY_KEY):
+            schedule_flush(countdown=BATCH_WINDOW * 5)
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            logging.warning("The lock of the emails flush expired before its end")
+
+
+def send_batch(connection, batch) -> list[str]:
+    """Send a batch of emails, and return the ones to retry."""
+
+    failed = []
+
+    for email_msg in batch:
+        message = EmailMessage(
+            subject=email_msg["subject"],
+            body=email_msg["body"],
+            to=(email_msg["to"],),
+            from_email=email_msg["from_email"],
+        )
+        message.content_subtype = email_msg["mime"]
+
+        if (sent := send(connection, message)) is None:
+            # Opening the new connection raises if the server is down, which leaves
+            # the batch to the next flush rather than failing its every email
+            logging.warning("The SMTP server closed the connection, reconnecting")
+            connection.close()
+            connection.open()
+            sent = send(connection, message)
+
+        if not sent:
+            email_msg["attempts"] += 1
+            if email_msg["attempts"] < MAX_ATTEMPTS:
+                failed.append(json.dumps(email_msg))
+            else:
+                logging.error(
+                    "Gave up sending email to %s after %d attempts",
+                    email_msg["to"],
+                    MAX_ATTEMPTS,
+                )
+
+    return failed
+
+
+def send(connection, message: EmailMessage) -> int | None:
+    """:return: The number of emails sent, None if the connection was closed."""
+
+    try:
+        return connection.send_messages([message])
+    except SMTPServerDisconnected:
+        return None
+    except Exception:
+        logging.exception("Could not send email to %s", ", ".join(message.to))
+        return 0
+
+
+def requeue(redis: Redis, key: str) -> int:
+    """Move the emails of a list back to the head of the queue, in order."""
+
+    count = 0
+    while redis.rpoplpush(key, QUEUE_KEY) is not None:
+        count += 1
 
-    if not email_msg.send():
-        raise self.retry(countdown=5)
+    return count
@@ -0,0 +1,153 @@
+from collections import Counter
+from collections.abc import Iterable
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.utils import timezone
+from notifications.models import Notification
+
+from apps.studx.counters import incr_unread_counts
+from apps.studx.models import (
+    Event,
+    Organization,
+    OrganizationGroup,
+    OrganizationMembership,
+)
+from apps.studx.push import publish
+from core.celery import app
+
+BATCH_SIZE = 500
+
+# A reference to a model instance that can be sent to the workers:
+# its content type id and its primary key.
+Ref = tuple[int, str]
+
+
+def to_ref(instance: models.Model | None) -> Ref | None:
+    if instance is None:
+        return None
+
+    return ContentType.objects.get_for_model(instance).pk, f"{instance.pk}"
+
+
+def notify_users(
+    actor: models.Model,
+    verb: str,
+    *,
+    recipient_ids: Iterable[int] | None = None,
+    org: Organization | None = None,
+    role: str | None = None,
+    group: OrganizationGroup | None = None,
+    action_object: models.Model | None = None,
+    target: models.Model | None = None,
+):
+    """
+    Schedule the fan-out of a notification.
+
+    The recipients are either the given users, the members of `group`, or the members
+    of `org` (only those with `role` if given), resolved when the task runs. The task is
+    only sent once the current transaction commits.
+    """
+
+    args = (to_ref(actor), verb)
+    kwargs = {
+        "recipient_ids": None if recipient_ids is None else list(recipient_ids),
+        "org_id": None if org is None else org.pk,
+        "role": role,
+        "group_id": None if group is None else group.pk,
+        "action_object": to_ref(action_object),
+        "target": to_ref(target),
+    }
+
+    transaction.on_commit(lambda: notify_task.delay(*args, **kwargs))
+
+
+def notify_audience(actor: models.Model, verb: str, event: Event):
+    """Schedule the fan-out of a notification about `event` to its audience."""
+
+    audience = {}
+
+    if event.audience == Event.Audience.ATTENDEES:
+        audience["recipient_ids"] = event.attendees.values_list("pk", flat=True)
+    elif event.audience == Event.Audience.GROUP:
+        if event.audience_group_id is None:
+            audience["recipient_ids"] = []
+        else:
+            audience["group"] = event.audience_group
+    else:
+        audience["org"] = event.org
+        audience["role"] = event.audience_role
+
+    notify_users(actor, verb, **audience, action_object=event, target=event.org)
+
+
+@app.task(
+    ignore_result=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 10},
+)
+def notify_task(
+    actor: Ref,
+    verb: str,
+    recipient_ids: list[int] | None = None,
+    org_id: int | None = None,
+    role: str | None = None,
+    group_id: int | None = None,
+    action_object: Ref | None = None,
+    target: Ref | None = None,
+) -> int:
+    """
+    Create a notification for each recipient, with batched INSERTs.
+
+    Users are not notified of their own actions.
+
+    :return: The number of notifications created.
+    """
+
+    if group_id is not None:
+        recipient_ids = OrganizationGroup.members.through.objects.filter(
+            organizationgroup_id=group_id
+        ).values_list("user_id", flat=True)
+    elif org_id is not None:
+        memberships = OrganizationMembership.objects.filter(org_id=org_id)
+        if role is not None:
+            memberships = memberships.filter(role=role)
+        recipient_ids = memberships.values_list("user_id", flat=True)
+
+    actor_id = (
+        int(actor[1])
+        if actor[0] == ContentType.objects.get_for_model(get_user_model()).pk
+        else None
+    )
+
+    fields = {
+        "actor_content_type_id": actor[0],
+        "actor_object_id": actor[1],
+        "verb": verb,
+        "timestamp": timezone.now(),
+    }
+    for name, ref in (("action_object", action_object), ("target", target)):
+        if ref is not None:
+            fields[f"{name}_content_type_id"], fields[f"{name}_object_id"] = ref
+
+    # All or nothing, so that a retry does not notify the same users twice
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(
+            [
+                Notification(recipient_id=recipient_id, **fields)
+                for recipient_id in recipient_ids or []
+                if recipient_id != actor_id
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+    incr_unread_counts(Counter(n.recipient_id for n in notifications))
+    publish(
+        verb,
+        fields["timestamp"].isoformat(),
+        {n.recipient_id: n.pk for n in notifications},
+    )
+
+    return len(notifications)
@@ -0,0 +1,40 @@
+from celery.utils.log import logging
+from django.apps import apps
+
+from apps.studx.cache import invalidate_org
+from apps.studx.models import Organization
+from core.celery import app
+from helpers.images import InvalidPicture, generate_renditions
+
+
+# Pictures which can not be decoded are not retried, only the storage errors are
+@app.task(
+    ignore_result=True,
+    autoretry_for=(OSError,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": 10},
+)
+def renditions_task(model: str, pk: int):
+    """
+    Generate the renditions of the picture of an instance.
+
+    :param model: The label of the model of the instance, as `app_label.ModelName`.
+    :param pk: The primary key of the instance.
+    """
+
+    instance = apps.get_model(model).objects.filter(pk=pk).first()
+
+    if instance is None or not instance.picture:
+        return
+
+    try:
+        renditions = generate_renditions(instance.picture.name)
+    except InvalidPicture:
+        logging.exception("Could not decode the picture of %s(%s)", model, pk)
+        return
+
+    instance.picture_renditions = {"source": instance.picture.name, **renditions}
+    instance.save(update_fields=("picture_renditions",))
+
+    if isinstance(instance, Organization):
+        invalidate_org(instance.slug, members=True)
@@ -8,8 +8,33 @@ export const addEvent = async (org: string, request: CreateEventRequest) => {
   });
 };
 
-export const listEvents = async (org: string) => {
-  return await apifetch(`orgs/${org}/events/`);
+export const listEvents = async (
+  org: string,
+  range?: { startsAfter: Date; endsBefore: Date }
+) => {
+  return await apifetch(`orgs/${org}/events/`, {
+    query: range && {
+      starts_after: range.startsAfter.toISOString(),
+      ends_before: range.endsBefore.toISOString(),
+    },
+  });
+};
+
+// Fetches every page of the events within a range, following the cursors.
+export const listEventsBetween = async (
+  org: string,
+  startsAfter: Date,
+  endsBefore: Date
+) => {
+  let page = await listEvents(org, { startsAfter, endsBefore });
+  const events = [...page.results];
+
+  while (page.next) {
+    page = await apifetch(page.next);
+    events.push(...page.results);
+  }
+
+  return events;
 };
 
 export const getEvent = async (org: string, slug: string) => {